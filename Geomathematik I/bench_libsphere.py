@@ -0,0 +1,320 @@
+"""
+Benchmark and accuracy checks for libsphere.
+
+Times the scalar solvers and their batch variants, and checks round-trip identities
+(e.g. ha1 after ha2 returns the target point) including the edge cases near the poles,
+near antipodes and along a meridian. Results are written as JSON, and can be compared
+against the results of an earlier run to catch regressions:
+
+    python bench_libsphere.py --output bench.json
+    python bench_libsphere.py --baseline bench.json
+
+It also measures the time of "import libsphere", and checks that the import does not
+load the plotting libraries.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import timeit
+from math import pi, tau
+
+import numpy as np
+
+import libnvector
+from libsphere import (
+    SphereCoords,
+    SphereTriangle,
+    bgs,
+    bgs_many,
+    ha1,
+    ha1_many,
+    ha2,
+    ha2_many,
+    set_backend,
+    vws,
+    vws_many,
+)
+
+# Allowed slowdown (factor) and loss of accuracy (absolute) against the baseline.
+TIME_FACTOR = 1.5
+ACCURACY_SLACK = 1e-9
+
+# Results which are not compared: the numpy import time measures the interpreter, it is
+# only the reference for the libsphere import time.
+UNCOMPARED = {"timing.import.numpy"}
+
+# Modules which must not be loaded by "import libsphere" (only by the plot_* helpers).
+HEAVY_MODULES = ["matplotlib", "cartopy"]
+
+
+def angle_diff(a, b):
+    return np.abs(np.mod(np.asarray(a) - b + pi, tau) - pi)
+
+
+def random_points(rng: np.random.Generator, n: int):
+    phi = rng.uniform(-1.5, 1.5, n)
+    lam = rng.uniform(-pi, pi, n)
+    return phi, lam
+
+
+"""
+Timings
+"""
+
+
+def time_call(fn, repeat: int = 5, number: int = None) -> float:
+    """Best time per call in seconds."""
+    timer = timeit.Timer(fn)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def bench_scalar() -> dict:
+    P1 = SphereCoords(0.9, 0.1)
+    P2 = SphereCoords(1.0, 0.3)
+    s12, a12, a21 = ha2(P1, P2)
+    P3, _ = ha1(P1, 0.2, a12 - 0.5)
+    _, a13, _ = ha2(P1, P3)
+    s23, a23, _ = ha2(P2, P3)
+    s13 = ha2(P1, P3)[0]
+
+    calls = {
+        "ha1": lambda: ha1(P1, 0.2, 1.0),
+        "ha2": lambda: ha2(P1, P2),
+        "vws": lambda: vws(P1, P2, a13, a23),
+        "bgs": lambda: bgs(P1, P2, s13, s23),
+        "SphereTriangle.sws": lambda: SphereTriangle.sws(0.5, 0.7, 1.1),
+        "SphereTriangle.wsw": lambda: SphereTriangle.wsw(0.5, 0.7, 1.1),
+        "SphereTriangle.ssw": lambda: SphereTriangle.ssw(1.0, 0.8, 0.5),
+        "SphereTriangle.wws": lambda: SphereTriangle.wws(1.0, 0.8, 0.5),
+        "SphereTriangle.sss": lambda: SphereTriangle.sss(0.5, 0.7, 0.9),
+        "SphereTriangle.www": lambda: SphereTriangle.www(1.0, 1.1, 1.2),
+    }
+    return {name: time_call(fn) for name, fn in calls.items()}
+
+
+def bench_batch(n: int) -> dict:
+    rng = np.random.default_rng(0)
+    phi1, lam1 = random_points(rng, n)
+    phi2, lam2 = random_points(rng, n)
+    s = rng.uniform(0.01, 2, n)
+    a = rng.uniform(0, tau, n)
+    x, y, z = (rng.uniform(0.3, 1.2, n) for _ in range(3))
+
+    calls = {
+        "ha1_many": lambda: ha1_many(phi1, lam1, s, a),
+        "ha2_many": lambda: ha2_many(phi1, lam1, phi2, lam2),
+        "nvector.ha1_many": lambda: libnvector.ha1_many(phi1, lam1, s, a),
+        "nvector.ha2_many": lambda: libnvector.ha2_many(phi1, lam1, phi2, lam2),
+        "vws_many": lambda: vws_many(phi1, lam1, phi2, lam2, a, a + 1),
+        "bgs_many": lambda: bgs_many(phi1, lam1, phi2, lam2, s, s),
+        "SphereTriangle.sws_batch": lambda: SphereTriangle.sws_batch(x, y, z),
+        "SphereTriangle.wsw_batch": lambda: SphereTriangle.wsw_batch(x, y, z),
+        "SphereTriangle.ssw_batch": lambda: SphereTriangle.ssw_batch(x, y, z),
+        "SphereTriangle.wws_batch": lambda: SphereTriangle.wws_batch(x, y, z),
+        "SphereTriangle.sss_batch": lambda: SphereTriangle.sss_batch(x, y, z),
+        "SphereTriangle.www_batch": lambda: SphereTriangle.www_batch(x, y, z),
+    }
+    # Per element, so that it compares directly to the scalar timings.
+    return {name: time_call(fn, number=1) / n for name, fn in calls.items()}
+
+
+def bench_import(repeat: int = 5) -> dict:
+    """
+    Time of "import libsphere" in a fresh interpreter (best of repeat), minus the time
+    of an interpreter which only imports numpy, so that it measures libsphere itself.
+    """
+    script = (
+        "import sys, time; t = time.perf_counter(); import {module}; "
+        "print(time.perf_counter() - t); "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+
+    def run(module: str):
+        out = subprocess.run(
+            [sys.executable, "-c", script.format(module=module)],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.splitlines()
+        return float(out[0]), out[1] if len(out) > 1 else ""
+
+    numpy_time = min(run("numpy")[0] for _ in range(repeat))
+    runs = [run("libsphere") for _ in range(repeat)]
+    return {
+        "libsphere": max(min(t for t, _ in runs) - numpy_time, 0.0),
+        "numpy": numpy_time,
+        "heavy_modules": runs[0][1],
+    }
+
+
+"""
+Accuracy
+"""
+
+
+def roundtrip_errors(phi1, lam1, phi2, lam2) -> dict:
+    """Largest errors of ha1(ha2(P1, P2)) == P2, scalar and batch."""
+    errors = {"scalar": 0.0, "batch": 0.0, "scalar_vs_batch": 0.0}
+
+    s, a, _ = ha2_many(phi1, lam1, phi2, lam2)
+    phi, lam, _ = ha1_many(phi1, lam1, s, a)
+    errors["batch"] = float(
+        np.max(np.maximum(np.abs(phi - phi2), angle_diff(lam, lam2) * np.cos(phi2)))
+    )
+
+    for i in range(len(phi1)):
+        P1 = SphereCoords(phi1[i], lam1[i])
+        P2 = SphereCoords(phi2[i], lam2[i])
+        s12, a12, _ = ha2(P1, P2)
+        P, _ = ha1(P1, s12, a12)
+        error = max(
+            abs(P.phi - P2.phi), float(angle_diff(P.lam, P2.lam)) * np.cos(P2.phi)
+        )
+        errors["scalar"] = max(errors["scalar"], error)
+        errors["scalar_vs_batch"] = max(errors["scalar_vs_batch"], abs(s12 - s[i]))
+
+    return errors
+
+
+def accuracy(n: int) -> dict:
+    rng = np.random.default_rng(1)
+    cases = {}
+
+    phi1, lam1 = random_points(rng, n)
+    phi2, lam2 = random_points(rng, n)
+    cases["random"] = (phi1, lam1, phi2, lam2)
+
+    # Near the poles
+    phi1 = rng.choice([-1, 1], n) * rng.uniform(pi / 2 - 1e-3, pi / 2 - 1e-7, n)
+    phi2 = rng.choice([-1, 1], n) * rng.uniform(1.4, pi / 2 - 1e-7, n)
+    cases["near_pole"] = (phi1, lam1, phi2, lam1 + rng.uniform(-3, 3, n))
+
+    # Near antipodes
+    phi1, lam1 = random_points(rng, n)
+    offset = rng.uniform(1e-6, 1e-3, n)
+    cases["near_antipodal"] = (phi1, lam1, -phi1 + offset, lam1 + pi - offset)
+
+    # Along a meridian
+    phi1, lam1 = random_points(rng, n)
+    cases["meridian"] = (phi1, lam1, rng.uniform(-1.5, 1.5, n), lam1)
+
+    results = {name: roundtrip_errors(*case) for name, case in cases.items()}
+    set_backend("nvector")
+    results["nvector"] = {name: roundtrip_errors(*case) for name, case in cases.items()}
+    set_backend("triangle")
+
+    # vws and bgs: reconstruct a known third point on the left of P1 -> P2.
+    vws_error = bgs_error = 0.0
+    observations = []
+    for _ in range(n):
+        phi, lam = random_points(rng, 1)
+        P1 = SphereCoords(phi[0], lam[0])
+        P2, _ = ha1(P1, rng.uniform(0.01, 0.5), rng.uniform(0, tau))
+        s12, a12, a21 = ha2(P1, P2)
+        P3, _ = ha1(P1, rng.uniform(0.01, 0.5), a12 - rng.uniform(0.2, 2.5))
+        s13, a13, _ = ha2(P1, P3)
+        s23, a23, _ = ha2(P2, P3)
+        vws_error = max(vws_error, vws(P1, P2, a13, a23).geodesic_distance_to(P3))
+        bgs_error = max(bgs_error, bgs(P1, P2, s13, s23).geodesic_distance_to(P3))
+        observations.append((*P1, *P2, a13, a23, s13, s23, *P3))
+    results["vws"] = vws_error
+    results["bgs"] = bgs_error
+
+    phi1, lam1, _, phi2, lam2, _, a13, a23, s13, s23, phi3, lam3, _ = np.transpose(
+        observations
+    )
+    phi, lam = vws_many(phi1, lam1, phi2, lam2, a13, a23)
+    results["vws_many"] = float(np.max(ha2_many(phi, lam, phi3, lam3)[0]))
+    phi, lam = bgs_many(phi1, lam1, phi2, lam2, s13, s23)
+    results["bgs_many"] = float(np.max(ha2_many(phi, lam, phi3, lam3)[0]))
+
+    return results
+
+
+"""
+Comparison
+"""
+
+
+def flatten(d: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in d.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def regressions(results: dict, baseline: dict) -> list[str]:
+    found = []
+    heavy = results["timing"]["import"]["heavy_modules"]
+    if heavy:
+        found.append(f"import libsphere loads {heavy}")
+    current, before = flatten(results), flatten(baseline)
+    for key, value in current.items():
+        if key not in before or not isinstance(value, float) or key in UNCOMPARED:
+            continue
+        old = before[key]
+        if key.startswith("timing.") and value > old * TIME_FACTOR:
+            found.append(f"{key}: {old:.3e} -> {value:.3e} (slower)")
+        if key.startswith("accuracy.") and value > old + ACCURACY_SLACK:
+            found.append(f"{key}: {old:.3e} -> {value:.3e} (less accurate)")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results of an earlier run")
+    parser.add_argument("--n", type=int, default=100_000, help="batch size")
+    parser.add_argument("--n-accuracy", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = {
+        "timing": {
+            "scalar": bench_scalar(),
+            "batch": bench_batch(args.n),
+            "import": bench_import(),
+        },
+        "accuracy": accuracy(args.n_accuracy),
+    }
+
+    print(f"{'timing':32} {'per call':>12} {'per 1e6 calls':>14}")
+    for kind in ["scalar", "batch"]:
+        for name, t in results["timing"][kind].items():
+            print(f"{kind + ' ' + name:32} {t * 1e6:10.3f}µs {t * 1e6:13.3f}s")
+    print()
+    imports = results["timing"]["import"]
+    print(f"{'import libsphere':32} {imports['libsphere'] * 1e3:10.3f}ms")
+    if imports["heavy_modules"]:
+        print(f"  also loads {imports['heavy_modules']}")
+    print()
+    print("accuracy (max error, radians)")
+    for key, value in flatten(results["accuracy"]).items():
+        print(f"  {key:38} {value:.3e}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f))
+        print()
+        if found:
+            print("Regressions:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
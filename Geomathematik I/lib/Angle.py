@@ -1,5 +1,6 @@
 from __future__ import annotations
 import math
+import numpy as np
 
 # Creates an Angle from Radians
 def rad(rad: float) -> Angle:
@@ -18,10 +19,10 @@ class Angle:
     rad: float
 
     def __init__(self, rad: float):
-        while rad < 0:
-            rad += math.tau
-        while rad > math.tau:
-            rad -= math.tau
+        rad = rad % math.tau
+        # Tiny negative angles round up to tau
+        if rad == math.tau:
+            rad = 0.0
         self.rad = rad
 
     def __str__(self) -> str:
@@ -36,9 +37,13 @@ class Angle:
         return Angle(self.rad + math.pi)
 
     def __add__(self, other: Angle) -> Angle:
+        if isinstance(other, AngleArray):
+            return NotImplemented
         return Angle(self.rad + other.rad)
 
     def __sub__(self, other: Angle) -> Angle:
+        if isinstance(other, AngleArray):
+            return NotImplemented
         return Angle(self.rad - other.rad)
 
     def sin(self) -> float:
@@ -49,3 +54,76 @@ class Angle:
 
     def tan(self) -> float:
         return math.tan(self.rad)
+
+
+# Creates an AngleArray from Radians
+def rad_many(rad: np.ndarray) -> AngleArray:
+    return AngleArray(rad)
+
+
+# Creates an AngleArray from Gon
+def gon_many(gon: np.ndarray) -> AngleArray:
+    return AngleArray(np.asarray(gon, dtype=float) * math.tau / 400)
+
+
+# Many angles at once, with the same semantics as Angle.
+# Internally stored as an array of radians, normalized to the range [0, 2pi).
+# Arithmetic works element-wise with other AngleArrays of the same shape, or with a single Angle.
+class AngleArray:
+    rad: np.ndarray
+
+    def __init__(self, rad: np.ndarray):
+        rad = np.mod(np.asarray(rad, dtype=float), math.tau)
+        self.rad = np.where(rad == math.tau, 0.0, rad)
+
+    @classmethod
+    def from_angles(AngleArray, angles: list[Angle]) -> AngleArray:
+        return AngleArray([angle.rad for angle in angles])
+
+    @property
+    def gon(self) -> np.ndarray:
+        return self.rad * 400 / math.tau
+
+    def __str__(self) -> str:
+        return "[" + ", ".join(f"{gon:.3f} gon" for gon in self.gon.flat) + "]"
+
+    def __len__(self) -> int:
+        return len(self.rad)
+
+    # A single index gives an Angle, slices and masks give an AngleArray.
+    def __getitem__(self, index) -> Angle | AngleArray:
+        rad = self.rad[index]
+        if np.ndim(rad) == 0:
+            return Angle(float(rad))
+        return AngleArray(rad)
+
+    def __iter__(self):
+        return (Angle(float(rad)) for rad in self.rad)
+
+    def __neg__(self) -> AngleArray:
+        return AngleArray(-self.rad)
+
+    # Returns the angles pointing in the opposite direction
+    def flip(self) -> AngleArray:
+        return AngleArray(self.rad + math.pi)
+
+    def __add__(self, other: Angle | AngleArray) -> AngleArray:
+        return AngleArray(self.rad + other.rad)
+
+    def __radd__(self, other: Angle) -> AngleArray:
+        return AngleArray(other.rad + self.rad)
+
+    def __sub__(self, other: Angle | AngleArray) -> AngleArray:
+        return AngleArray(self.rad - other.rad)
+
+    def __rsub__(self, other: Angle) -> AngleArray:
+        return AngleArray(other.rad - self.rad)
+
+    def sin(self) -> np.ndarray:
+        return np.sin(self.rad)
+
+    def cos(self) -> np.ndarray:
+        return np.cos(self.rad)
+
+    def tan(self) -> np.ndarray:
+        return np.tan(self.rad)
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from math import acos, atan2, sqrt, cos, sin, atan
-from typing import Tuple
+from dataclasses import dataclass
+from math import acos, atan2, sqrt, cos, sin, atan, hypot
+from typing import Optional, Tuple
 
 import numpy as np
 
@@ -183,25 +184,57 @@ def Rückwärtsschnitt_Collins(
     return N
 
 
+@dataclass
 class CoordinateTransformation:
     scale: float
     rotation: float
     translation: Point
+    # Residuals (target - transformed) of the control points, N x 2.
+    # Only set if the transformation was estimated from control points.
+    residuals: Optional[np.ndarray] = None
 
     def __str__(self) -> str:
         return f"scale={self.scale}, rotation={self.rotation}, translation={self.translation}"
 
+    @property
+    def rms(self) -> float:
+        return float(np.sqrt(np.mean(np.sum(self.residuals**2, axis=1))))
+
+    def matrix(self) -> np.ndarray:
+        c, s = cos(self.rotation), sin(self.rotation)
+        return self.scale * np.array([[c, -s], [s, c]])
+
     def transform(self, point: Point) -> Point:
         point = point - self.translation
         point = point * self.scale
 
+        c, s = cos(self.rotation), sin(self.rotation)
         point = Point(
-            point.x * cos(self.rotation) - point.y * sin(self.rotation),
-            point.x * sin(self.rotation) + point.y * cos(self.rotation),
+            point.x * c - point.y * s,
+            point.x * s + point.y * c,
         )
 
         return point
 
+    # The same transformation as one homogeneous 3x3 matrix, e.g. to chain it with others.
+    # This module has no Transform class, the matrix equals Transform.m of lib2d/Matrix.py.
+    def to_transform(self) -> np.ndarray:
+        m = np.eye(3)
+        m[:2, :2] = self.matrix()
+        m[:2, 2] = -m[:2, :2] @ (self.translation.x, self.translation.y)
+        return m
+
+    # Transforms coordinate arrays x, y. The rotation matrix is computed only once.
+    def transform_many(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        (m11, m12), (m21, m22) = self.matrix()
+        dx = np.asarray(x) - self.translation.x
+        dy = np.asarray(y) - self.translation.y
+        return m11 * dx + m12 * dy, m21 * dx + m22 * dy
+
 
 # Given a pair of points in the coordinate system 1, and a pair of points in the coordinate system 2,
 # returns the transformation from cs1 -> cs2.
@@ -238,3 +271,50 @@ def HelmertTransform(
         rotation=phi,
         translation=Point(dx, dy),
     )
+
+
+def _coordinates(points) -> Tuple[np.ndarray, np.ndarray]:
+    if len(points) and isinstance(points[0], Point):
+        return np.array([p.x for p in points]), np.array([p.y for p in points])
+    points = np.asarray(points, dtype=float)
+    return points[:, 0], points[:, 1]
+
+
+# Given N >= 2 points in the coordinate system 1 and the same points in the coordinate system 2,
+# returns the least-squares transformation from cs1 -> cs2, including the residuals.
+# Points can be given as lists of Points or as N x 2 arrays.
+def HelmertTransform_many(
+    points_cs1,
+    points_cs2,
+    weights: Optional[np.ndarray] = None,
+) -> CoordinateTransformation:
+    x1, y1 = _coordinates(points_cs1)
+    x2, y2 = _coordinates(points_cs2)
+    w = np.ones(len(x1)) if weights is None else np.asarray(weights, dtype=float)
+
+    # Reduce to the centroids, so that large (e.g. Gauss-Krüger) coordinates do not cost
+    # accuracy. Then x2 = a * x1 - b * y1 and y2 = b * x1 + a * y1.
+    cx1, cy1 = w @ x1 / w.sum(), w @ y1 / w.sum()
+    cx2, cy2 = w @ x2 / w.sum(), w @ y2 / w.sum()
+    u1, v1 = x1 - cx1, y1 - cy1
+    u2, v2 = x2 - cx2, y2 - cy2
+
+    norm = w @ (u1**2 + v1**2)
+    a = w @ (u1 * u2 + v1 * v2) / norm
+    b = w @ (u1 * v2 - v1 * u2) / norm
+
+    # transform computes scale * R(rotation) * (p - translation), so the translation is
+    # the point in cs1 which maps onto the origin of cs2.
+    scale = hypot(a, b)
+    c, s = a / scale**2, b / scale**2
+    tx = cx1 - (c * cx2 + s * cy2)
+    ty = cy1 - (-s * cx2 + c * cy2)
+
+    ct = CoordinateTransformation(
+        scale=scale,
+        rotation=atan2(b, a),
+        translation=Point(tx, ty),
+    )
+    x, y = ct.transform_many(x1, y1)
+    ct.residuals = np.stack([x2 - x, y2 - y], axis=-1)
+    return ct
@@ -2,8 +2,9 @@ import math
 import numpy as np
 from dataclasses import dataclass
 from typing import Optional, Tuple
+from lib2d.Matrix import Transform
 from lib2d.Point import Point
-from lib.Angle import Angle, rad, gon
+from lib.Angle import Angle, AngleArray, rad, gon, rad_many
 
 
 # Aus einem Punkt, einer Richtung und einer Länge, ergibt den nächsten Punkt
@@ -28,6 +29,31 @@ def HA2(
     return dist, angle
 
 
+# HA1 für viele Beobachtungen: Koordinatenarrays x, y, Längen s und Richtungen v
+def HA1_many(
+    x: np.ndarray,
+    y: np.ndarray,
+    s: np.ndarray,
+    v: AngleArray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    return (
+        x + s * v.cos(),
+        y + s * v.sin(),
+    )
+
+
+# HA2 für viele Punktpaare A, B, ergibt die Längen und die Richtungen
+def HA2_many(
+    xA: np.ndarray,
+    yA: np.ndarray,
+    xB: np.ndarray,
+    yB: np.ndarray,
+) -> Tuple[np.ndarray, AngleArray]:
+    dx = np.asarray(xB) - xA
+    dy = np.asarray(yB) - yA
+    return np.hypot(dx, dy), rad_many(np.arctan2(dy, dx))
+
+
 # Aus 3 Längen eines Dreiecks, ergibt die 3 (gegenüberliegenden) Winkel dieses Dreiecks
 def Halbwinkelsatz(
     a: float,
@@ -41,6 +67,20 @@ def Halbwinkelsatz(
     return (alpha, beta, gamma)
 
 
+# Halbwinkelsatz für viele Dreiecke. Ungültige Dreiecke ergeben NaN.
+def Halbwinkelsatz_many(
+    a: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+) -> Tuple[AngleArray, AngleArray, AngleArray]:
+    s = (np.asarray(a) + b + c) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha = rad_many(2 * np.arctan(np.sqrt((s - b) * (s - c) / (s * (s - a)))))
+        beta = rad_many(2 * np.arctan(np.sqrt((s - c) * (s - a) / (s * (s - b)))))
+        gamma = rad_many(2 * np.arctan(np.sqrt((s - a) * (s - b) / (s * (s - c)))))
+    return (alpha, beta, gamma)
+
+
 # Aus zwei Punkten (A, B) und den Längen ausgehend von diesen Punkten,
 # ergibt den Schnittpunkt (C) zweier Kreise mit diesen Radien.
 # Achtung: ABC ist im Uhrzeigersinn. Tauscht man A und B, gäbe es noch eine andere Lösung.
@@ -162,26 +202,190 @@ def Rückwärtsschnitt_Collins(
     return N
 
 
+# Array versions of the intersections above, for many points at once.
+# Points are given as coordinate arrays, angles as AngleArrays. All return x, y and a mask
+# of the valid results; degenerate geometries give NaN coordinates and False in the mask.
+# eps is the threshold for the sine of the intersection angle.
+
+
+# Bogenschnitt, ungültig wenn sich die Kreise nicht schneiden.
+def Bogenschnitt_many(
+    xA: np.ndarray,
+    yA: np.ndarray,
+    xB: np.ndarray,
+    yB: np.ndarray,
+    sAC: np.ndarray,
+    sBC: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    sAB, vAB = HA2_many(xA, yA, xB, yB)
+    alpha, beta, gamma = Halbwinkelsatz_many(sBC, sAC, sAB)
+
+    vAC = vAB + alpha
+    x, y = HA1_many(xA, yA, sAC, vAC)
+
+    # Halbwinkelsatz gives NaN if the triangle inequality does not hold
+    valid = np.isfinite(alpha.rad)
+    return np.where(valid, x, np.nan), np.where(valid, y, np.nan), valid
+
+
+# Vorwärtsschnitt mit orientierten Richtungen, ungültig bei (nahezu) parallelen Strahlen.
+def Vorwärtsschnitt_Richtung_many(
+    xA: np.ndarray,
+    yA: np.ndarray,
+    xB: np.ndarray,
+    yB: np.ndarray,
+    vAC: AngleArray,
+    vBC: AngleArray,
+    eps: float = 1e-9,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    sAB, vAB = HA2_many(xA, yA, xB, yB)
+
+    base = (vBC - vAC).sin()
+    valid = np.abs(base) > eps
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sAC = sAB * (vBC - vAB).sin() / base
+    x, y = HA1_many(xA, yA, sAC, vAC)
+
+    return np.where(valid, x, np.nan), np.where(valid, y, np.nan), valid
+
+
+# Vorwärtsschnitt mit Innenwinkeln, ungültig bei (nahezu) parallelen Strahlen.
+def Vorwärtsschnitt_Winkel_many(
+    xA: np.ndarray,
+    yA: np.ndarray,
+    xB: np.ndarray,
+    yB: np.ndarray,
+    alpha: AngleArray,
+    beta: AngleArray,
+    eps: float = 1e-9,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    sAB, vAB = HA2_many(xA, yA, xB, yB)
+
+    base = (alpha + beta).sin()
+    valid = np.abs(base) > eps
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sAC = sAB * beta.sin() / base
+    vAC = vAB + alpha
+    x, y = HA1_many(xA, yA, sAC, vAC)
+
+    return np.where(valid, x, np.nan), np.where(valid, y, np.nan), valid
+
+
+# Rückwärtsschnitt, ungültig wenn N auf dem gefährlichen Kreis durch L, M, R liegt.
+def Rückwärtsschnitt_many(
+    xL: np.ndarray,
+    yL: np.ndarray,
+    xM: np.ndarray,
+    yM: np.ndarray,
+    xR: np.ndarray,
+    yR: np.ndarray,
+    rNL: AngleArray,
+    rNM: AngleArray,
+    rNR: AngleArray,
+    eps: float = 1e-9,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    alpha = rNM - rNL
+    beta = rNR - rNM
+
+    sML, vML = HA2_many(xM, yM, xL, yL)
+    sMR, vMR = HA2_many(xM, yM, xR, yR)
+
+    a = alpha.sin() / sML
+    b = -beta.sin() / sMR
+
+    va = vMR - beta
+    vb = vML + alpha
+    # On the dangerous circle, the angle LMR and alpha + beta add up to 200 gon
+    base = (vML - vMR + alpha + beta).sin()
+    valid = np.abs(base) > eps
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = (a * va.cos() - b * vb.cos()) / base
+        mu = (a * va.sin() - b * vb.sin()) / base
+        sMN_sq = 1 / (gamma**2 + mu**2)
+        x = xM + sMN_sq * gamma
+        y = yM + sMN_sq * mu
+    return np.where(valid, x, np.nan), np.where(valid, y, np.nan), valid
+
+
+# Rückwärtsschnitt nach Collins. Auf dem gefährlichen Kreis fällt der Hilfspunkt H auf M,
+# dann ist die Richtung von H nach M unbestimmt.
+def Rückwärtsschnitt_Collins_many(
+    xL: np.ndarray,
+    yL: np.ndarray,
+    xM: np.ndarray,
+    yM: np.ndarray,
+    xR: np.ndarray,
+    yR: np.ndarray,
+    rNL: AngleArray,
+    rNM: AngleArray,
+    rNR: AngleArray,
+    eps: float = 1e-9,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    alpha = rNM - rNL
+    beta = rNR - rNM
+
+    xH, yH, valid_H = Vorwärtsschnitt_Winkel_many(xR, yR, xL, yL, alpha, beta, eps)
+    sHL, vHL = HA2_many(xH, yH, xL, yL)
+    sHM, vHM = HA2_many(xH, yH, xM, yM)
+    sHR, vHR = HA2_many(xH, yH, xR, yR)
+
+    gamma = vHM - vHR
+    delta = vHL - vHM
+
+    x, y, valid_N = Vorwärtsschnitt_Winkel_many(xL, yL, xR, yR, gamma, delta, eps)
+    sLR = np.hypot(np.asarray(xR) - xL, np.asarray(yR) - yL)
+    valid = valid_H & valid_N & (sHM > eps * sLR)
+    return np.where(valid, x, np.nan), np.where(valid, y, np.nan), valid
+
+
 @dataclass
 class CoordinateTransformation:
     scale: float
     rotation: Angle
     translation: Point
+    # Residuals (target - transformed) of the control points, N x 2.
+    # Only set if the transformation was estimated from control points.
+    residuals: Optional[np.ndarray] = None
 
     def __str__(self) -> str:
         return f"scale={self.scale}, rotation={self.rotation}, translation={self.translation}"
 
+    @property
+    def rms(self) -> float:
+        return float(np.sqrt(np.mean(np.sum(self.residuals**2, axis=1))))
+
+    def matrix(self) -> np.ndarray:
+        cos, sin = self.rotation.cos(), self.rotation.sin()
+        return self.scale * np.array([[cos, -sin], [sin, cos]])
+
     def transform(self, point: Point) -> Point:
         point = point - self.translation
         point = point * self.scale
 
+        cos, sin = self.rotation.cos(), self.rotation.sin()
         point = Point(
-            point.x * self.rotation.cos() - point.y * self.rotation.sin(),
-            point.x * self.rotation.sin() + point.y * self.rotation.cos(),
+            point.x * cos - point.y * sin,
+            point.x * sin + point.y * cos,
         )
 
         return point
 
+    # The same transformation as one homogeneous matrix, e.g. to chain it with others
+    def to_transform(self) -> Transform:
+        t = self.translation
+        return Transform.translation(-t.x, -t.y).scale(self.scale).rotate(self.rotation)
+
+    # Transforms coordinate arrays x, y. The rotation matrix is computed only once.
+    def transform_many(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        (m11, m12), (m21, m22) = self.matrix()
+        dx = np.asarray(x) - self.translation.x
+        dy = np.asarray(y) - self.translation.y
+        return m11 * dx + m12 * dy, m21 * dx + m22 * dy
+
 
 # Given a pair of points in the coordinate system 1, and a pair of points in the coordinate system 2,
 # returns the transformation from cs1 -> cs2.
@@ -218,3 +422,51 @@ def HelmertTransform(
         rotation=rad(phi),
         translation=Point(dx, dy),
     )
+
+
+def _coordinates(points) -> Tuple[np.ndarray, np.ndarray]:
+    if len(points) and isinstance(points[0], Point):
+        return np.array([p.x for p in points]), np.array([p.y for p in points])
+    points = np.asarray(points, dtype=float)
+    return points[:, 0], points[:, 1]
+
+
+# Given N >= 2 points in the coordinate system 1 and the same points in the coordinate system 2,
+# returns the least-squares transformation from cs1 -> cs2, including the residuals.
+# Points can be given as lists of Points or as N x 2 arrays.
+def HelmertTransform_many(
+    points_cs1,
+    points_cs2,
+    weights: Optional[np.ndarray] = None,
+) -> CoordinateTransformation:
+    x1, y1 = _coordinates(points_cs1)
+    x2, y2 = _coordinates(points_cs2)
+    w = np.ones(len(x1)) if weights is None else np.asarray(weights, dtype=float)
+
+    # Reduce to the centroids, so that large (e.g. Gauss-Krüger) coordinates do not cost
+    # accuracy. Then x2 = a * x1 - b * y1 and y2 = b * x1 + a * y1.
+    cx1, cy1 = w @ x1 / w.sum(), w @ y1 / w.sum()
+    cx2, cy2 = w @ x2 / w.sum(), w @ y2 / w.sum()
+    u1, v1 = x1 - cx1, y1 - cy1
+    u2, v2 = x2 - cx2, y2 - cy2
+
+    norm = w @ (u1**2 + v1**2)
+    a = w @ (u1 * u2 + v1 * v2) / norm
+    b = w @ (u1 * v2 - v1 * u2) / norm
+
+    # transform computes scale * R(rotation) * (p - translation), so the translation is
+    # the point in cs1 which maps onto the origin of cs2.
+    scale = math.hypot(a, b)
+    rotation = math.atan2(b, a)
+    cos, sin = a / scale**2, b / scale**2
+    tx = cx1 - (cos * cx2 + sin * cy2)
+    ty = cy1 - (-sin * cx2 + cos * cy2)
+
+    ct = CoordinateTransformation(
+        scale=scale,
+        rotation=rad(rotation),
+        translation=Point(tx, ty),
+    )
+    x, y = ct.transform_many(x1, y1)
+    ct.residuals = np.stack([x2 - x, y2 - y], axis=-1)
+    return ct
@@ -1,6 +1,8 @@
 from __future__ import annotations
 import math
-from lib2d.Segment import Segment
+from typing import Optional, Tuple
+import numpy as np
+from lib.Angle import AngleArray
 from lib2d.Algorithms import HA1
 from lib2d.Line import Line
 from lib2d.Point import Point
@@ -16,17 +18,68 @@ class Circle:
 
     @classmethod
     def from_points(cls, A: Point, B: Point, C: Point) -> Circle:
-        sAB = Segment.from_points(A, B)
-        sBC = Segment.from_points(B, C)
+        # Circumcenter in closed form, relative to A to keep large coordinates accurate
+        bx, by = B.x - A.x, B.y - A.y
+        cx, cy = C.x - A.x, C.y - A.y
+        d = 2 * (bx * cy - by * cx)
+        if d == 0:
+            raise ValueError("Points are collinear")
 
-        l1 = sAB.perpendicular_bisector()
-        l2 = sBC.perpendicular_bisector()
+        b2 = bx**2 + by**2
+        c2 = cx**2 + cy**2
+        ux = (cy * b2 - by * c2) / d
+        uy = (bx * c2 - cx * b2) / d
 
-        center = l1.intersection(l2)
-        radius = center.distance_to(A)
+        center = Point(A.x + ux, A.y + uy)
+        radius = math.hypot(ux, uy)
         return cls(center, radius)
 
-    def intersect_line(self, line: Line) -> tuple[Point, Point]:
+    @classmethod
+    def fit(
+        cls,
+        x: np.ndarray,
+        y: np.ndarray,
+        max_iterations: int = 20,
+        tolerance: float = 1e-12,
+    ) -> Circle:
+        """
+        Least-squares circle through many points (at least 3).
+
+        The algebraic fit (Kasa) gives the start values, which are refined by Gauss-Newton
+        on the geometric distances of the points to the circle.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        # Reduce to the centroid for accuracy
+        x0, y0 = x.mean(), y.mean()
+        u, v = x - x0, y - y0
+
+        # Algebraic: u^2 + v^2 = 2 a u + 2 b v + c, with r^2 = c + a^2 + b^2
+        A = np.column_stack([2 * u, 2 * v, np.ones_like(u)])
+        (a, b, c), *_ = np.linalg.lstsq(A, u**2 + v**2, rcond=None)
+        r = math.sqrt(c + a**2 + b**2)
+
+        # Geometric: minimize sum (|p_i - center| - r)^2
+        for _ in range(max_iterations):
+            du, dv = u - a, v - b
+            rho = np.hypot(du, dv)
+            J = np.column_stack([-du / rho, -dv / rho, -np.ones_like(u)])
+            step, *_ = np.linalg.lstsq(J, -(rho - r), rcond=None)
+            a, b, r = a + step[0], b + step[1], r + step[2]
+            if np.max(np.abs(step)) <= tolerance * max(r, 1):
+                break
+
+        return cls(Point(x0 + a, y0 + b), abs(r))
+
+    # Signed distances of the points to the circle (positive outside)
+    def residuals(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        dx = np.asarray(x) - self.center.x
+        dy = np.asarray(y) - self.center.y
+        return np.hypot(dx, dy) - self.radius
+
+    # Returns None if the line misses the circle
+    def intersect_line(self, line: Line) -> Optional[tuple[Point, Point]]:
         # Translate coordinates so that the circle is centered at the origin
         # We later translate the result back
         o = line.offset - self.center
@@ -39,10 +92,50 @@ class Circle:
         ph = d.x * o.x + d.y * o.y
         q = o.x**2 + o.y**2 - self.radius**2
 
-        t0 = -ph + math.sqrt(ph**2 - q)
-        t1 = -ph - math.sqrt(ph**2 - q)
+        discriminant = ph**2 - q
+        if discriminant < 0:
+            return None
+
+        t0 = -ph + math.sqrt(discriminant)
+        t1 = -ph - math.sqrt(discriminant)
 
         p1 = o + d * t0 + self.center
         p2 = o + d * t1 + self.center
 
         return p1, p2
+
+
+# Intersections of many circles (center x, y and radius) with many lines (through the
+# points x0, y0 with the directions angle), element-wise. Returns the coordinates of both
+# intersections and a mask, which is False where the line misses the circle (NaN there).
+# A tangent gives the same point twice; eps accepts rounding errors of tangents.
+def intersect_lines_many(
+    x: np.ndarray,
+    y: np.ndarray,
+    radius: np.ndarray,
+    x0: np.ndarray,
+    y0: np.ndarray,
+    angle: AngleArray,
+    eps: float = 1e-12,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    ox = np.asarray(x0) - x
+    oy = np.asarray(y0) - y
+    dx, dy = angle.cos(), angle.sin()
+    radius = np.asarray(radius)
+
+    ph = dx * ox + dy * oy
+    q = ox**2 + oy**2 - radius**2
+    discriminant = ph**2 - q
+    valid = discriminant >= -eps * radius**2
+
+    root = np.sqrt(np.where(valid, np.maximum(discriminant, 0), np.nan))
+    t0 = -ph + root
+    t1 = -ph - root
+
+    return (
+        x0 + dx * t0,
+        y0 + dy * t0,
+        x0 + dx * t1,
+        y0 + dy * t1,
+        valid,
+    )
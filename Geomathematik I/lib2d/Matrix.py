@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import numpy as np
+
 from lib2d.Point import Point
 from lib.Angle import Angle
 
@@ -39,3 +41,110 @@ class Matrix:
             self.xx * point.x + self.xy * point.y,
             self.yx * point.x + self.yy * point.y,
         )
+
+
+"""
+Homogeneous transformation (affine, e.g. translation, rotation, scale):
+
+T = | xx xy x0 |
+    | yx yy y0 |
+    |  0  0  1 |
+"""
+
+
+# A chain of transformations is fused into a single matrix, so applying it to coordinate
+# arrays is one pass over the data. The methods translate, rotate, scale and affine return
+# a new Transform, which applies the additional step after the existing ones:
+#   T = Transform.translation(-x0, -y0).scale(s).rotate(gon(50))
+class Transform:
+    m: np.ndarray
+
+    def __init__(self, m: np.ndarray):
+        self.m = np.asarray(m, dtype=float)
+
+    def __repr__(self) -> str:
+        return f"Transform({self.m[:2].tolist()})"
+
+    @classmethod
+    def identity(cls) -> Transform:
+        return cls(np.eye(3))
+
+    @classmethod
+    def affine(
+        cls,
+        xx: float,
+        xy: float,
+        yx: float,
+        yy: float,
+        x0: float = 0,
+        y0: float = 0,
+    ) -> Transform:
+        return cls([[xx, xy, x0], [yx, yy, y0], [0, 0, 1]])
+
+    @classmethod
+    def from_matrix(cls, matrix: Matrix) -> Transform:
+        return cls.affine(matrix.xx, matrix.xy, matrix.yx, matrix.yy)
+
+    @classmethod
+    def translation(cls, dx: float, dy: float) -> Transform:
+        return cls.affine(1, 0, 0, 1, dx, dy)
+
+    @classmethod
+    def rotation(cls, angle: Angle) -> Transform:
+        return cls.from_matrix(Matrix.rotation(angle))
+
+    @classmethod
+    def scaling(cls, sx: float, sy: float = None) -> Transform:
+        return cls.affine(sx, 0, 0, sx if sy is None else sy)
+
+    # Applies self first, then other
+    def then(self, other: Transform) -> Transform:
+        return other @ self
+
+    def translate(self, dx: float, dy: float) -> Transform:
+        return self.then(Transform.translation(dx, dy))
+
+    def rotate(self, angle: Angle) -> Transform:
+        return self.then(Transform.rotation(angle))
+
+    def scale(self, sx: float, sy: float = None) -> Transform:
+        return self.then(Transform.scaling(sx, sy))
+
+    # Like matrices: (A @ B) applies B first
+    def __matmul__(self, other: Transform) -> Transform:
+        return Transform(self.m @ other.m)
+
+    def __mul__(self, point: Point) -> Point:
+        (xx, xy, x0), (yx, yy, y0), _ = self.m.tolist()
+        return Point(
+            xx * point.x + xy * point.y + x0,
+            yx * point.x + yy * point.y + y0,
+        )
+
+    # Transforms coordinate arrays x, y
+    def apply(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        (xx, xy, x0), (yx, yy, y0), _ = self.m.tolist()
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        return xx * x + xy * y + x0, yx * x + yy * y + y0
+
+    # Transforms an N x 2 array of points in one matrix product
+    def apply_points(self, points: np.ndarray) -> np.ndarray:
+        points = np.asarray(points, dtype=float)
+        return points @ self.m[:2, :2].T + self.m[:2, 2]
+
+    # Inverse in closed form (adjugate of the 2x2 part), the last row stays exactly 0 0 1
+    def inverse(self) -> Transform:
+        (xx, xy, x0), (yx, yy, y0), _ = self.m.tolist()
+        det = xx * yy - xy * yx
+        if det == 0:
+            raise ValueError("Transform is not invertible")
+        ixx, ixy, iyx, iyy = yy / det, -xy / det, -yx / det, xx / det
+        return Transform.affine(
+            ixx,
+            ixy,
+            iyx,
+            iyy,
+            -(ixx * x0 + ixy * y0),
+            -(iyx * x0 + iyy * y0),
+        )
@@ -1,9 +1,12 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Sequence
+import numpy as np
 from matplotlib import pyplot as plt
+from matplotlib.collections import EllipseCollection, LineCollection
+from lib.Angle import AngleArray
 from lib2d.Segment import Segment
 from lib2d.Circle import Circle
-from lib2d.Algorithms import HA1
+from lib2d.Algorithms import HA1, HA1_many
 from lib2d.Point import Point
 from lib2d.Line import Line
 
@@ -54,5 +57,73 @@ class Plot:
             )
         )
 
+    # Batch versions of the methods above. Each draws a single matplotlib artist for all
+    # elements, which keeps large networks fast to render and small in memory.
+    # Points are given as coordinate arrays (x pointing up, y to the right).
+
+    def add_points(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        labels: Optional[Sequence[str]] = None,
+        max_labels: int = 200,
+        **kwargs,
+    ):
+        """
+        Draws all points as one scatter plot. Of the points inside the plot area, at most
+        max_labels (evenly spaced) get a label, since text artists are expensive.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.ax.scatter(y, x, **kwargs)
+
+        if labels is None:
+            return
+        visible = np.flatnonzero(
+            (x >= self.min.x)
+            & (x <= self.max.x)
+            & (y >= self.min.y)
+            & (y <= self.max.y)
+        )
+        step = max(1, -(-len(visible) // max_labels))
+        for i in visible[::step]:
+            self.ax.annotate(labels[i], (y[i], x[i]))
+
+    def add_segments(
+        self,
+        x1: np.ndarray,
+        y1: np.ndarray,
+        x2: np.ndarray,
+        y2: np.ndarray,
+        **kwargs,
+    ):
+        x1, y1, x2, y2 = np.broadcast_arrays(x1, y1, x2, y2)
+        segments = np.stack(
+            [np.stack([y1, x1], axis=-1), np.stack([y2, x2], axis=-1)], axis=1
+        )
+        self.ax.add_collection(LineCollection(segments, **kwargs))
+
+    def add_lines(self, x: np.ndarray, y: np.ndarray, angle: AngleArray, **kwargs):
+        """Draws lines through the points (x, y) with the given directions."""
+        x1, y1 = HA1_many(x, y, 1000, angle)
+        x2, y2 = HA1_many(x, y, -1000, angle)
+        self.add_segments(x1, y1, x2, y2, **kwargs)
+
+    def add_circles(self, x: np.ndarray, y: np.ndarray, radius: np.ndarray, **kwargs):
+        x, y, radius = np.broadcast_arrays(x, y, radius)
+        kwargs.setdefault("facecolors", "none")
+        kwargs.setdefault("edgecolors", "C0")
+        self.ax.add_collection(
+            EllipseCollection(
+                widths=2 * radius,
+                heights=2 * radius,
+                angles=0,
+                units="xy",
+                offsets=np.column_stack([y, x]),
+                offset_transform=self.ax.transData,
+                **kwargs,
+            )
+        )
+
     def save(self, filename: str):
         self.fig.savefig(filename)
@@ -1,6 +1,8 @@
 from __future__ import annotations
-from math import asin, sqrt, sin, cos, acos, tau
+from math import asin, sqrt, sin, cos, acos, pi, tau
+from dataclasses import dataclass
 from itertools import product
+import numpy as np
 
 
 class Vec3:
@@ -100,6 +102,127 @@ class Vec3:
         return other * (self.dot(other) / other.dot(other))
 
 
+# Many vectors at once, stored as a contiguous N x 3 array.
+# Same operations as Vec3, but element-wise. The other operand can be a Vec3Array of the
+# same length or a single Vec3. Scalar results (dot, length, ...) are arrays of length N.
+class Vec3Array:
+    data: np.ndarray
+
+    # The data is always copied, so normalize() does not modify the caller's array.
+    def __init__(self, data: np.ndarray):
+        self.data = np.array(np.reshape(data, (-1, 3)), dtype=float)
+
+    @classmethod
+    def from_xyz(cls, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> Vec3Array:
+        return Vec3Array(np.stack(np.broadcast_arrays(x, y, z), axis=-1))
+
+    @classmethod
+    def from_vecs(cls, vecs: list[Vec3]) -> Vec3Array:
+        return Vec3Array([(v.x, v.y, v.z) for v in vecs])
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.data[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.data[:, 2]
+
+    def __repr__(self) -> str:
+        return f"Vec3Array({len(self)} vectors)"
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    # A single index gives a Vec3, slices and masks give a Vec3Array.
+    def __getitem__(self, index) -> Vec3 | Vec3Array:
+        if isinstance(index, (int, np.integer)):
+            return Vec3(*(float(c) for c in self.data[index]))
+        return Vec3Array(self.data[index])
+
+    def __iter__(self):
+        return (Vec3(*row) for row in self.data.tolist())
+
+    def __add__(self, other: Vec3 | Vec3Array) -> Vec3Array:
+        return Vec3Array(self.data + _as_array(other))
+
+    def __sub__(self, other: Vec3 | Vec3Array) -> Vec3Array:
+        return Vec3Array(self.data - _as_array(other))
+
+    def __mul__(self, scale: float | np.ndarray) -> Vec3Array:
+        return Vec3Array(self.data * _as_column(scale))
+
+    def __rmul__(self, scale: float | np.ndarray) -> Vec3Array:
+        return self * scale
+
+    def __truediv__(self, scale: float | np.ndarray) -> Vec3Array:
+        return Vec3Array(self.data / _as_column(scale))
+
+    def __neg__(self) -> Vec3Array:
+        return Vec3Array(-self.data)
+
+    def dot(self, other: Vec3 | Vec3Array) -> np.ndarray:
+        other = np.broadcast_to(_as_array(other), self.data.shape)
+        return np.einsum("ij,ij->i", self.data, other)
+
+    def cross(self, other: Vec3 | Vec3Array) -> Vec3Array:
+        return Vec3Array(np.cross(self.data, _as_array(other)))
+
+    def length(self) -> np.ndarray:
+        return np.sqrt(self.dot(self))
+
+    def normalize(self) -> np.ndarray:
+        l = self.length()
+        self.data /= l[:, None]
+        return l
+
+    def normalized(self) -> Vec3Array:
+        return self / self.length()
+
+    def equals(self, other: Vec3 | Vec3Array, epsilon: float = 1e-6) -> np.ndarray:
+        return np.all(np.abs(self.data - _as_array(other)) < epsilon, axis=1)
+
+    def angle_between(
+        self,
+        other: Vec3 | Vec3Array,
+        optimize_for_small_angles: bool = False,
+    ) -> np.ndarray:
+        lengths = self.length() * _length(other)
+        if optimize_for_small_angles:
+            return np.arcsin(np.clip(self.cross(other).length() / lengths, -1, 1))
+        else:
+            return np.arccos(np.clip(self.dot(other) / lengths, -1, 1))
+
+    def distance_to(self, other: Vec3 | Vec3Array) -> np.ndarray:
+        return (self - other).length()
+
+    def projected_on(self, other: Vec3 | Vec3Array) -> Vec3Array:
+        other = _as_array(other)
+        scale = self.dot(other) / _length(other) ** 2
+        return Vec3Array(other * _as_column(scale))
+
+
+def _as_array(v: Vec3 | Vec3Array) -> np.ndarray:
+    if isinstance(v, Vec3Array):
+        return v.data
+    if isinstance(v, Vec3):
+        return np.array([v.x, v.y, v.z])
+    return np.asarray(v, dtype=float)
+
+
+def _as_column(scale: float | np.ndarray):
+    scale = np.asarray(scale, dtype=float)
+    return scale[:, None] if scale.ndim == 1 else scale
+
+
+def _length(v: Vec3 | Vec3Array | np.ndarray):
+    return np.linalg.norm(_as_array(v), axis=-1)
+
+
 class Mat3:
     xx: float
     xy: float
@@ -174,12 +297,17 @@ class Mat3:
                 self.yx * x + self.yy * y + self.yz * z,
                 self.zx * x + self.zy * y + self.zz * z,
             )
-        elif isinstance(other, Mat3):
+        elif isinstance(other, Vec3Array):
+            # One matrix product for all vectors: (M v_i)^T = v_i^T M^T
+            return Vec3Array(other.data @ self.to_array().T)
+        elif isinstance(other, (Mat3, Mat3Stack)):
             return self @ other
         else:
             raise TypeError("Invalid type")
 
     def __matmul__(self, other: Mat3) -> Mat3:
+        if isinstance(other, Mat3Stack):
+            return NotImplemented
         return Mat3(
             (
                 self.xx * other.xx + self.xy * other.yx + self.xz * other.zx,
@@ -198,6 +326,16 @@ class Mat3:
             ),
         )
 
+    def to_array(self) -> np.ndarray:
+        return np.array(
+            [
+                [self.xx, self.xy, self.xz],
+                [self.yx, self.yy, self.yz],
+                [self.zx, self.zy, self.zz],
+            ],
+            dtype=float,
+        )
+
     def determinate(self) -> float:
         return (
             self.xx * self.yy * self.zz
@@ -354,6 +492,373 @@ class Mat3:
             )
 
 
+# Many 3x3 matrices at once (e.g. a time series of rotations), stored as an N x 3 x 3 array.
+# Unlike Mat3, the euler angles and the rotation axis are computed in closed form.
+class Mat3Stack:
+    data: np.ndarray
+
+    def __init__(self, data: np.ndarray):
+        self.data = np.ascontiguousarray(np.reshape(data, (-1, 3, 3)), dtype=float)
+
+    @classmethod
+    def from_mats(cls, mats: list[Mat3]) -> Mat3Stack:
+        return Mat3Stack([m.to_array() for m in mats])
+
+    @classmethod
+    def identity(cls, n: int) -> Mat3Stack:
+        return Mat3Stack(np.broadcast_to(np.eye(3), (n, 3, 3)))
+
+    def __repr__(self) -> str:
+        return f"Mat3Stack({len(self)} matrices)"
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    # A single index gives a Mat3, slices and masks give a Mat3Stack.
+    def __getitem__(self, index) -> Mat3 | Mat3Stack:
+        if isinstance(index, (int, np.integer)):
+            return Mat3(*self.data[index].tolist())
+        return Mat3Stack(self.data[index])
+
+    def __iter__(self):
+        return (Mat3(*m) for m in self.data.tolist())
+
+    def __add__(self, other: Mat3 | Mat3Stack) -> Mat3Stack:
+        return Mat3Stack(self.data + _as_matrices(other))
+
+    def __sub__(self, other: Mat3 | Mat3Stack) -> Mat3Stack:
+        return Mat3Stack(self.data - _as_matrices(other))
+
+    def __mul__(self, other: float | np.ndarray | Vec3 | Vec3Array | Mat3 | Mat3Stack):
+        if isinstance(other, (Vec3, Vec3Array)):
+            # Matrix i is applied to vector i (or every matrix to the same Vec3)
+            v = np.broadcast_to(_as_array(other), (len(self), 3))
+            return Vec3Array(np.einsum("nij,nj->ni", self.data, v))
+        if isinstance(other, (Mat3, Mat3Stack)):
+            return self @ other
+        scale = np.asarray(other, dtype=float)
+        return Mat3Stack(self.data * (scale[:, None, None] if scale.ndim else scale))
+
+    def __matmul__(self, other: Mat3 | Mat3Stack) -> Mat3Stack:
+        return Mat3Stack(self.data @ _as_matrices(other))
+
+    def __rmatmul__(self, other: Mat3) -> Mat3Stack:
+        return Mat3Stack(_as_matrices(other) @ self.data)
+
+    def determinate(self) -> np.ndarray:
+        return np.linalg.det(self.data)
+
+    def is_rotation(self, epsilon: float = 1e-3) -> np.ndarray:
+        orthogonal = np.abs(self.data @ self.transpose().data - np.eye(3)) < epsilon
+        unit = np.abs(self.determinate() - 1) < epsilon
+        return np.all(orthogonal, axis=(1, 2)) & unit
+
+    def transpose(self) -> Mat3Stack:
+        return Mat3Stack(np.swapaxes(self.data, 1, 2))
+
+    def inverse(self) -> Mat3Stack:
+        return Mat3Stack(np.linalg.inv(self.data))
+
+    def axis_and_angle(self) -> tuple[Vec3Array, np.ndarray]:
+        """
+        Rotation axes (normalized) and angles in [0, pi].
+
+        The angle follows from the trace and the skew-symmetric part
+        R - R^T = 2 sin(angle) [axis]x, which also gives the axis.
+        Close to angle = pi the skew part vanishes, so there the axis is taken from the symmetric part (1 - cos(angle)) axis axis^T.
+        Without rotation, the axis is arbitrary and (0, 0, 1) is returned.
+        """
+        R = self.data
+        skew = np.stack(
+            [
+                R[:, 2, 1] - R[:, 1, 2],
+                R[:, 0, 2] - R[:, 2, 0],
+                R[:, 1, 0] - R[:, 0, 1],
+            ],
+            axis=-1,
+        )
+
+        # atan2 stays accurate close to 0 and pi, where acos of the trace does not
+        cos_angle = (np.trace(R, axis1=1, axis2=2) - 1) / 2
+        angle = np.arctan2(np.linalg.norm(skew, axis=1) / 2, cos_angle)
+
+        # Largest column of the symmetric part, oriented like the skew part
+        S = (R + np.swapaxes(R, 1, 2)) / 2 - cos_angle[:, None, None] * np.eye(3)
+        column = np.argmax(np.diagonal(S, axis1=1, axis2=2), axis=1)
+        symmetric = S[np.arange(len(R)), :, column]
+        sign = np.where(np.einsum("ij,ij->i", symmetric, skew) < 0, -1.0, 1.0)
+
+        axis = np.where((angle < pi / 2)[:, None], skew, sign[:, None] * symmetric)
+        length = np.linalg.norm(axis, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            axis = np.where(
+                (length > 1e-15)[:, None], axis / length[:, None], [0.0, 0.0, 1.0]
+            )
+
+        return Vec3Array(axis), angle
+
+    def euler_angles(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Euler angles theta in [0, pi], psi and phi in [0, 2pi), as used by from_euler_angles.
+
+        In the gimbal lock (theta = 0 or pi) only phi + psi (or phi - psi) is defined.
+        Then psi is set to 0 and phi is taken from the upper left block.
+        """
+        R = self.data
+        theta = np.arccos(np.clip(R[:, 2, 2], -1, 1))
+        psi = np.arctan2(R[:, 2, 0], R[:, 2, 1])
+        phi = np.arctan2(R[:, 0, 2], -R[:, 1, 2])
+
+        locked = np.sin(theta) < 1e-12
+        psi = np.where(locked, 0.0, psi)
+        phi = np.where(locked, np.arctan2(R[:, 1, 0], R[:, 0, 0]), phi)
+
+        return theta, np.mod(psi, tau), np.mod(phi, tau)
+
+    @classmethod
+    def from_axis_and_angle(
+        cls,
+        axis: Vec3 | Vec3Array,
+        angle: np.ndarray,
+        infinitesimal: bool = False,
+    ) -> Mat3Stack:
+        axis = np.atleast_2d(_as_array(axis))
+        angle = np.atleast_1d(np.asarray(angle, dtype=float))
+        axis, angle = np.broadcast_arrays(axis, angle[:, None])
+        angle = angle[:, 0]
+        axis = axis / np.linalg.norm(axis, axis=1)[:, None]
+
+        x, y, z = axis.T
+        zero = np.zeros_like(x)
+        A = np.stack(
+            [
+                np.stack([zero, -z, y], axis=-1),
+                np.stack([z, zero, -x], axis=-1),
+                np.stack([-y, x, zero], axis=-1),
+            ],
+            axis=1,
+        )
+        I = np.eye(3)
+
+        if infinitesimal:
+            return Mat3Stack(I + A * angle[:, None, None])
+        else:
+            P = axis[:, :, None] * axis[:, None, :]
+            cos_a = np.cos(angle)[:, None, None]
+            sin_a = np.sin(angle)[:, None, None]
+            return Mat3Stack(P + (I - P) * cos_a + A * sin_a)
+
+    @classmethod
+    def from_euler_angles(
+        cls,
+        theta: np.ndarray,
+        psi: np.ndarray,
+        phi: np.ndarray,
+        infinitesimal: bool = False,
+    ) -> Mat3Stack:
+        theta, psi, phi = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (theta, psi, phi))
+        )
+        zero = np.zeros_like(theta)
+        if infinitesimal:
+            return Mat3Stack(
+                np.eye(3)
+                + np.stack(
+                    [
+                        np.stack([zero, -phi - psi, zero], axis=-1),
+                        np.stack([phi + psi, zero, -theta], axis=-1),
+                        np.stack([zero, theta, zero], axis=-1),
+                    ],
+                    axis=1,
+                )
+            )
+        else:
+            st, ct = np.sin(theta), np.cos(theta)
+            ss, cs = np.sin(psi), np.cos(psi)
+            sp, cp = np.sin(phi), np.cos(phi)
+            return Mat3Stack(
+                np.stack(
+                    [
+                        np.stack(
+                            [cp * cs - sp * ss * ct, -cp * ss - sp * cs * ct, sp * st],
+                            axis=-1,
+                        ),
+                        np.stack(
+                            [sp * cs + cp * ss * ct, -sp * ss + cp * cs * ct, -cp * st],
+                            axis=-1,
+                        ),
+                        np.stack([ss * st, cs * st, ct], axis=-1),
+                    ],
+                    axis=1,
+                )
+            )
+
+
+def _as_matrices(m: Mat3 | Mat3Stack) -> np.ndarray:
+    if isinstance(m, Mat3Stack):
+        return m.data
+    if isinstance(m, Mat3):
+        return m.to_array()
+    return np.asarray(m, dtype=float)
+
+
+@dataclass
+class RotationFit:
+    rotation: Mat3
+    # Rotation axis (Euler pole) and angle, the axis is normalized
+    axis: Vec3
+    angle: float
+    # Distance |R p_i - r_i| per station, for all stations (also rejected ones)
+    residuals: np.ndarray
+    # Mask of the stations used in the final fit
+    inliers: np.ndarray
+
+    @property
+    def rms(self) -> float:
+        return float(np.sqrt(np.mean(self.residuals[self.inliers] ** 2)))
+
+
+def _fit_rotation(p: np.ndarray, r: np.ndarray, w: np.ndarray) -> np.ndarray:
+    # Kabsch: the rotation R minimizing sum w_i |R p_i - r_i|^2 follows from the SVD of
+    # H = sum w_i p_i r_i^T. The last sign keeps det(R) = 1, i.e. no reflection.
+    H = (p * w[:, None]).T @ r
+    U, _, Vt = np.linalg.svd(H)
+    d = np.sign(np.linalg.det(Vt.T @ U.T))
+    return Vt.T @ np.diag([1, 1, d]) @ U.T
+
+
+def fit_rotation(
+    p: Vec3Array,
+    r: Vec3Array,
+    weights: np.ndarray = None,
+    outlier_factor: float = None,
+    max_iterations: int = 10,
+) -> RotationFit:
+    """
+    Best-fit rotation about the origin, which moves the stations p onto their displaced
+    positions r (least squares, one SVD).
+
+    With outlier_factor, stations whose residual exceeds outlier_factor times the RMS of
+    the current inliers are rejected and the rotation is fitted again, until the set of
+    inliers no longer changes (or after max_iterations).
+    """
+    p, r = _as_array(p), _as_array(r)
+    w = np.ones(len(p)) if weights is None else np.asarray(weights, dtype=float)
+
+    inliers = np.ones(len(p), dtype=bool)
+    for _ in range(max_iterations):
+        R = _fit_rotation(p[inliers], r[inliers], w[inliers])
+        residuals = np.linalg.norm(p @ R.T - r, axis=1)
+        if outlier_factor is None:
+            break
+
+        rms = np.sqrt(np.mean(residuals[inliers] ** 2))
+        new_inliers = residuals <= outlier_factor * rms
+        # A rotation needs at least two stations which are not collinear with the origin
+        if new_inliers.sum() < 2 or np.array_equal(new_inliers, inliers):
+            break
+        inliers = new_inliers
+    else:
+        # Out of iterations: fit once more, so the result belongs to the final inliers
+        R = _fit_rotation(p[inliers], r[inliers], w[inliers])
+        residuals = np.linalg.norm(p @ R.T - r, axis=1)
+
+    axis, angle = Mat3Stack(R).axis_and_angle()
+    return RotationFit(
+        rotation=Mat3(*R.tolist()),
+        axis=axis[0],
+        angle=float(angle[0]),
+        residuals=residuals,
+        inliers=inliers,
+    )
+
+
+# 3D similarity transformation (7 parameters): x' = translation + scale * rotation * x
+@dataclass
+class Helmert:
+    translation: Vec3
+    rotation: Mat3
+    scale: float
+    # Residual vectors (target - transformed source) of the identical points, N x 3
+    residuals: np.ndarray = None
+
+    @property
+    def rms(self) -> float:
+        return float(np.sqrt(np.mean(np.sum(self.residuals**2, axis=1))))
+
+    @property
+    def rotations(self) -> Vec3:
+        # Rotation vector (axis * angle). For small rotations these are the rotation
+        # angles rx, ry, rz about the coordinate axes.
+        axis, angle = Mat3Stack(self.rotation.to_array()).axis_and_angle()
+        return axis[0] * float(angle[0])
+
+    def transform(self, point: Vec3) -> Vec3:
+        return self.translation + self.rotation * point * self.scale
+
+    def transform_many(
+        self,
+        points: np.ndarray | Vec3Array,
+        chunksize: int = 1_000_000,
+    ) -> np.ndarray:
+        """
+        Transforms an N x 3 array of points, chunk by chunk, into a new N x 3 array.
+        Chunking limits the temporary memory for very large point files.
+        """
+        points = _as_array(points).reshape(-1, 3)
+        out = np.empty(points.shape)
+        M = self.scale * self.rotation.to_array().T
+        t = _as_array(self.translation)
+        for start in range(0, len(points), chunksize):
+            chunk = slice(start, start + chunksize)
+            np.matmul(points[chunk], M, out=out[chunk])
+            out[chunk] += t
+        return out
+
+    def inverse(self) -> Helmert:
+        R = self.rotation.transpose()
+        return Helmert(
+            translation=-(R * self.translation) / self.scale,
+            rotation=R,
+            scale=1 / self.scale,
+        )
+
+
+def fit_helmert(
+    source: np.ndarray | Vec3Array,
+    target: np.ndarray | Vec3Array,
+    weights: np.ndarray = None,
+) -> Helmert:
+    """
+    Least-squares 7-parameter transformation from N >= 3 identical points (Umeyama).
+
+    Both point sets are reduced to their (weighted) centroids first, which keeps the
+    solution accurate for large coordinates such as ECEF.
+    """
+    p, q = _as_array(source), _as_array(target)
+    w = np.ones(len(p)) if weights is None else np.asarray(weights, dtype=float)
+    w = w / w.sum()
+
+    p0 = w @ p
+    q0 = w @ q
+    P = p - p0
+    Q = q - q0
+
+    U, D, Vt = np.linalg.svd((Q * w[:, None]).T @ P)
+    S = np.diag([1, 1, np.sign(np.linalg.det(U) * np.linalg.det(Vt))])
+    R = U @ S @ Vt
+    scale = np.trace(np.diag(D) @ S) / (w @ np.sum(P**2, axis=1))
+    t = q0 - scale * R @ p0
+
+    helmert = Helmert(
+        translation=Vec3(*t.tolist()),
+        rotation=Mat3(*R.tolist()),
+        scale=float(scale),
+    )
+    helmert.residuals = q - helmert.transform_many(p)
+    return helmert
+
+
 # Vorwärtsschnitt
 def vws(
     A: Vec3,
@@ -371,3 +876,55 @@ def vws(
     # C = A + sAC * AC
 
     return C
+
+
+@dataclass
+class RayIntersection:
+    # Least-squares intersection points, N x 3
+    points: np.ndarray
+    # Distance of each ray to its intersection point, N x K
+    residuals: np.ndarray
+    # Condition number of the normal equations per point. Large values mean that the rays
+    # are nearly parallel, infinite values that they are exactly parallel.
+    condition: np.ndarray
+
+
+# Vorwärtsschnitt with K rays for each of N points
+def vws_many(
+    origins: np.ndarray,
+    directions: np.ndarray,
+    weights: np.ndarray = None,
+) -> RayIntersection:
+    """
+    Least-squares intersections of rays: for each point, the position with the smallest
+    (weighted) sum of squared distances to its K rays, given by origins and directions
+    (both N x K x 3). A weight of 0 excludes a ray, so points can have different numbers
+    of rays.
+
+    If the rays of a point are (nearly) parallel, the position along them is undetermined.
+    Then the solution closest to the mean of the ray origins is returned.
+    """
+    a = np.asarray(origins, dtype=float)
+    d = np.asarray(directions, dtype=float)
+    d = d / np.linalg.norm(d, axis=-1, keepdims=True)
+    w = np.ones(a.shape[:-1]) if weights is None else np.asarray(weights, dtype=float)
+
+    # Projections onto the planes perpendicular to the rays: I - d d^T
+    P = np.eye(3) - d[..., :, None] * d[..., None, :]
+    A = np.einsum("nk,nkij->nij", w, P)
+    b = np.einsum("nk,nkij,nkj->ni", w, P, a)
+
+    # Solve relative to the mean origin. pinv drops the undetermined directions, so
+    # these stay at the mean origin instead of running off to infinity.
+    center = np.einsum("nk,nki->ni", w, a) / w.sum(axis=1)[:, None]
+    rhs = b - np.einsum("nij,nj->ni", A, center)
+    points = center + np.einsum("nij,nj->ni", np.linalg.pinv(A, rcond=1e-10), rhs)
+
+    s = np.linalg.svd(A, compute_uv=False)
+    with np.errstate(divide="ignore"):
+        condition = np.where(s[:, -1] > 0, s[:, 0] / s[:, -1], np.inf)
+
+    offsets = points[:, None, :] - a
+    residuals = np.linalg.norm(np.einsum("nkij,nkj->nki", P, offsets), axis=-1)
+
+    return RayIntersection(points, residuals, condition)
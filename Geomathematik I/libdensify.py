@@ -0,0 +1,166 @@
+"""
+Densification of geodesic lines and circles on the sphere.
+
+All functions take arrays of segments (or circles) and produce their vertices in one pass.
+Since segments can get different numbers of vertices, the results are returned as flat
+arrays phi, lam together with offsets: the vertices of segment i are [offsets[i]:offsets[i+1]].
+
+The number of vertices is given either directly (n), as the maximum angle between two
+vertices (step), or as the maximum distance between the polyline and the true curve
+(tolerance, in the same unit as the radius r).
+"""
+
+from __future__ import annotations
+from math import tau
+import numpy as np
+
+
+def _to_vec(phi: np.ndarray, lam: np.ndarray) -> np.ndarray:
+    cos_phi = np.cos(phi)
+    return np.stack(
+        [cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)], axis=-1
+    )
+
+
+def _from_vec(v: np.ndarray):
+    phi = np.arctan2(v[..., 2], np.hypot(v[..., 0], v[..., 1]))
+    lam = np.arctan2(v[..., 1], v[..., 0])
+    return phi, lam
+
+
+def chord_step(tolerance: float, r: float = 1) -> float:
+    """
+    Largest angle between two vertices on a circle of radius r, for which the chord
+    deviates at most by tolerance from the arc: r * (1 - cos(step / 2)) <= tolerance.
+    """
+    return 2 * np.arccos(np.clip(1 - tolerance / r, -1, 1))
+
+
+def _vertex_counts(angles: np.ndarray, n: int, step: float, tolerance: float, r):
+    """Number of vertices for curves spanning the given angles (at least 2 each)."""
+    if n is not None:
+        return np.full(angles.shape, max(int(n), 2))
+    if tolerance is not None:
+        with np.errstate(divide="ignore"):
+            step = chord_step(tolerance, r)
+    if step is None:
+        raise ValueError("Either n, step or tolerance must be given")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        counts = np.ceil(np.abs(angles) / step)
+    return np.maximum(np.nan_to_num(counts, posinf=1).astype(int) + 1, 2)
+
+
+def _expand(counts: np.ndarray):
+    """Segment index and interpolation parameter t in [0, 1] for every vertex."""
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    segment = np.repeat(np.arange(len(counts)), counts)
+    i = np.arange(offsets[-1]) - offsets[segment]
+    t = i / (counts[segment] - 1)
+    return segment, t, offsets
+
+
+def _unwrap(lam: np.ndarray, segment: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Removes jumps of 2pi in longitude within each segment, so they can be plotted as one line."""
+    starts = offsets[:-1]
+    steps = np.mod(np.diff(lam, prepend=lam[:1]) + np.pi, tau) - np.pi
+    steps[starts] = 0
+    total = np.cumsum(steps)
+    return lam[starts][segment] + total - total[starts][segment]
+
+
+def densify_lines(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    phi2: np.ndarray,
+    lam2: np.ndarray,
+    n: int = None,
+    step: float = None,
+    tolerance: float = None,
+    r: float = 1,
+):
+    """
+    Vertices along the geodesics from (phi1, lam1) to (phi2, lam2), by spherical linear
+    interpolation (slerp) of the unit vectors. Both end points are included.
+    Antipodal end points do not define a unique geodesic.
+
+    Returns phi, lam, offsets.
+    """
+    phi1, lam1, phi2, lam2 = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(x, dtype=float)) for x in (phi1, lam1, phi2, lam2))
+    )
+    a = _to_vec(phi1, lam1)
+    b = _to_vec(phi2, lam2)
+    omega = np.arctan2(np.linalg.norm(np.cross(a, b), axis=-1), np.sum(a * b, axis=-1))
+
+    counts = _vertex_counts(omega, n, step, tolerance, r)
+    segment, t, offsets = _expand(counts)
+
+    w = omega[segment]
+    sin_w = np.sin(w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fa = np.where(sin_w > 1e-12, np.sin((1 - t) * w) / sin_w, 1 - t)
+        fb = np.where(sin_w > 1e-12, np.sin(t * w) / sin_w, t)
+    v = fa[:, None] * a[segment] + fb[:, None] * b[segment]
+
+    phi, lam = _from_vec(v)
+    return phi, _unwrap(lam, segment, offsets), offsets
+
+
+def densify_circles(
+    phi: np.ndarray,
+    lam: np.ndarray,
+    radius: np.ndarray,
+    az1: np.ndarray = 0,
+    az2: np.ndarray = tau,
+    n: int = None,
+    step: float = None,
+    tolerance: float = None,
+    r: float = 1,
+):
+    """
+    Vertices along geodesic circles (all points at the distance radius from the center),
+    from azimuth az1 to az2. By default the full, closed circle is generated.
+
+    Returns phi, lam, offsets.
+    """
+    phi, lam, radius, az1, az2 = np.broadcast_arrays(
+        *(
+            np.atleast_1d(np.asarray(x, dtype=float))
+            for x in (phi, lam, radius, az1, az2)
+        )
+    )
+    rho = radius / r
+
+    # The circle has the radius r * sin(rho) in its own plane.
+    sweep = az2 - az1
+    counts = _vertex_counts(sweep, n, step, tolerance, r * np.abs(np.sin(rho)))
+    segment, t, offsets = _expand(counts)
+
+    # Local frame at the centers: position, north and east unit vectors
+    c = _to_vec(phi, lam)
+    north = np.stack(
+        [-np.sin(phi) * np.cos(lam), -np.sin(phi) * np.sin(lam), np.cos(phi)], axis=-1
+    )
+    east = np.stack([-np.sin(lam), np.cos(lam), np.zeros_like(lam)], axis=-1)
+
+    az = az1[segment] + t * sweep[segment]
+    rho = rho[segment]
+    v = (
+        np.cos(rho)[:, None] * c[segment]
+        + (np.sin(rho) * np.cos(az))[:, None] * north[segment]
+        + (np.sin(rho) * np.sin(az))[:, None] * east[segment]
+    )
+
+    phi, lam = _from_vec(v)
+    return phi, _unwrap(lam, segment, offsets), offsets
+
+
+def with_breaks(phi: np.ndarray, lam: np.ndarray, offsets: np.ndarray):
+    """
+    Joins all segments into one polyline, separated by NaN.
+    Matplotlib does not connect across NaN, so all segments can be drawn with a single plot call.
+    """
+    breaks = offsets[1:-1]
+    phi = np.insert(phi.astype(float), breaks, np.nan)
+    lam = np.insert(lam.astype(float), breaks, np.nan)
+    return phi, lam
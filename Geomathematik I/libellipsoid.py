@@ -0,0 +1,228 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from math import pi, tau
+import numpy as np
+from libsphere import SphereCoords
+
+
+# A rotational ellipsoid, given by its semi-major axis a and semi-minor axis b (in [m]).
+@dataclass(frozen=True)
+class Ellipsoid:
+    a: float
+    b: float
+
+    @classmethod
+    def from_flattening(Ellipsoid, a: float, f: float) -> Ellipsoid:
+        return Ellipsoid(a, a * (1 - f))
+
+    @property
+    def f(self) -> float:
+        return (self.a - self.b) / self.a
+
+    @property
+    def e2(self) -> float:
+        # First eccentricity squared
+        return (self.a**2 - self.b**2) / self.a**2
+
+    def gaussian_radius(self, phi: float) -> float:
+        """
+        Gaussian mean radius of curvature sqrt(M * N) at latitude phi.
+
+        This is the radius of the sphere which best approximates the ellipsoid around phi.
+        """
+        w2 = 1 - self.e2 * np.sin(phi) ** 2
+        return self.b / w2
+
+
+WGS84 = Ellipsoid.from_flattening(6378137.0, 1 / 298.257223563)
+GRS80 = Ellipsoid.from_flattening(6378137.0, 1 / 298.257222101)
+BESSEL = Ellipsoid.from_flattening(6377397.155, 1 / 299.1528128)
+
+
+# The solutions below follow Vincenty (1975). Both problems need an iteration, which runs on
+# all array elements at once. Elements that have converged are no longer updated.
+# Near-antipodal points may not converge in the inverse problem, their results are NaN.
+
+
+def ha1_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    s12: np.ndarray,
+    a12: np.ndarray,
+    ellipsoid: Ellipsoid = WGS84,
+    tolerance: float = 1e-12,
+    max_iterations: int = 200,
+):
+    """
+    Direct problem on the ellipsoid for arrays of start points, distances (in [m]) and azimuths.
+
+    Returns the arrays phi2, lam2 and the reverse azimuth a21 (from P2 back to P1),
+    just like libsphere.ha1_many.
+    """
+    phi1, lam1, s12, a12 = np.broadcast_arrays(*map(np.asarray, (phi1, lam1, s12, a12)))
+    a, b, f = ellipsoid.a, ellipsoid.b, ellipsoid.f
+
+    # Reduced latitude
+    tanU1 = (1 - f) * np.tan(phi1)
+    cosU1 = 1 / np.sqrt(1 + tanU1**2)
+    sinU1 = tanU1 * cosU1
+
+    sin_a12, cos_a12 = np.sin(a12), np.cos(a12)
+    sigma1 = np.arctan2(tanU1, cos_a12)
+    sin_alpha = cosU1 * sin_a12
+    cos2_alpha = 1 - sin_alpha**2
+    u2 = cos2_alpha * (a**2 - b**2) / b**2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+
+    sigma = s12 / (b * A)
+    active = np.ones(sigma.shape, dtype=bool)
+    for _ in range(max_iterations):
+        cos2sm = np.cos(2 * sigma1 + sigma)
+        sin_s, cos_s = np.sin(sigma), np.cos(sigma)
+        delta_sigma = (
+            B
+            * sin_s
+            * (
+                cos2sm
+                + B
+                / 4
+                * (
+                    cos_s * (-1 + 2 * cos2sm**2)
+                    - B / 6 * cos2sm * (-3 + 4 * sin_s**2) * (-3 + 4 * cos2sm**2)
+                )
+            )
+        )
+        sigma_new = s12 / (b * A) + delta_sigma
+        active &= np.abs(sigma_new - sigma) > tolerance
+        sigma = np.where(active, sigma_new, sigma)
+        if not active.any():
+            break
+    else:
+        sigma = np.where(active, np.nan, sigma)
+
+    cos2sm = np.cos(2 * sigma1 + sigma)
+    sin_s, cos_s = np.sin(sigma), np.cos(sigma)
+
+    x = sinU1 * sin_s - cosU1 * cos_s * cos_a12
+    phi2 = np.arctan2(
+        sinU1 * cos_s + cosU1 * sin_s * cos_a12,
+        (1 - f) * np.sqrt(sin_alpha**2 + x**2),
+    )
+    lam = np.arctan2(sin_s * sin_a12, cosU1 * cos_s - sinU1 * sin_s * cos_a12)
+    C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+    L = lam - (1 - C) * f * sin_alpha * (
+        sigma + C * sin_s * (cos2sm + C * cos_s * (-1 + 2 * cos2sm**2))
+    )
+    lam2 = lam1 + L
+
+    # Azimuth of the geodesic at P2, pointing away from P1. Flip it to get the reverse azimuth.
+    alpha2 = np.arctan2(sin_alpha, -x)
+    a21 = np.mod(alpha2 + pi, tau)
+
+    return phi2, lam2, a21
+
+
+def ha2_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    phi2: np.ndarray,
+    lam2: np.ndarray,
+    ellipsoid: Ellipsoid = WGS84,
+    tolerance: float = 1e-12,
+    max_iterations: int = 200,
+):
+    """
+    Inverse problem on the ellipsoid for arrays of point pairs.
+
+    Returns the arrays distance (in [m]), azimuth and reverse azimuth,
+    just like libsphere.ha2_many.
+    """
+    phi1, lam1, phi2, lam2 = np.broadcast_arrays(
+        *map(np.asarray, (phi1, lam1, phi2, lam2))
+    )
+    a, b, f = ellipsoid.a, ellipsoid.b, ellipsoid.f
+
+    L = np.mod(lam2 - lam1 + pi, tau) - pi
+
+    tanU1 = (1 - f) * np.tan(phi1)
+    cosU1 = 1 / np.sqrt(1 + tanU1**2)
+    sinU1 = tanU1 * cosU1
+    tanU2 = (1 - f) * np.tan(phi2)
+    cosU2 = 1 / np.sqrt(1 + tanU2**2)
+    sinU2 = tanU2 * cosU2
+
+    def evaluate(lam):
+        sin_l, cos_l = np.sin(lam), np.cos(lam)
+        sin_s = np.sqrt(
+            (cosU2 * sin_l) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cos_l) ** 2
+        )
+        cos_s = sinU1 * sinU2 + cosU1 * cosU2 * cos_l
+        sigma = np.arctan2(sin_s, cos_s)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sin_alpha = np.where(sin_s == 0, 0.0, cosU1 * cosU2 * sin_l / sin_s)
+            cos2_alpha = 1 - sin_alpha**2
+            # On the equator cos2_alpha is 0 and cos2sm is not used.
+            cos2sm = np.where(
+                cos2_alpha == 0, 0.0, cos_s - 2 * sinU1 * sinU2 / cos2_alpha
+            )
+        C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        lam_new = L + (1 - C) * f * sin_alpha * (
+            sigma + C * sin_s * (cos2sm + C * cos_s * (-1 + 2 * cos2sm**2))
+        )
+        return lam_new, sin_s, cos_s, sigma, cos2_alpha, cos2sm
+
+    lam = L
+    active = np.ones(lam.shape, dtype=bool)
+    for _ in range(max_iterations):
+        lam_new = evaluate(lam)[0]
+        active &= np.abs(lam_new - lam) > tolerance
+        lam = np.where(active, lam_new, lam)
+        if not active.any():
+            break
+    else:
+        lam = np.where(active, np.nan, lam)
+
+    _, sin_s, cos_s, sigma, cos2_alpha, cos2sm = evaluate(lam)
+
+    u2 = cos2_alpha * (a**2 - b**2) / b**2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = (
+        B
+        * sin_s
+        * (
+            cos2sm
+            + B
+            / 4
+            * (
+                cos_s * (-1 + 2 * cos2sm**2)
+                - B / 6 * cos2sm * (-3 + 4 * sin_s**2) * (-3 + 4 * cos2sm**2)
+            )
+        )
+    )
+    distance = b * A * (sigma - delta_sigma)
+
+    sin_l, cos_l = np.sin(lam), np.cos(lam)
+    azimuth = np.arctan2(cosU2 * sin_l, cosU1 * sinU2 - sinU1 * cosU2 * cos_l)
+    alpha2 = np.arctan2(cosU1 * sin_l, -sinU1 * cosU2 + cosU1 * sinU2 * cos_l)
+
+    azimuth = np.mod(azimuth, tau)
+    reverse_azimuth = np.mod(alpha2 + pi, tau)
+
+    return distance, azimuth, reverse_azimuth
+
+
+# Same call shape as libsphere.ha1, but on the ellipsoid. The radius of p1 is ignored.
+def ha1(p1: SphereCoords, s12: float, a12: float, ellipsoid: Ellipsoid = WGS84):
+    phi1, lam1, r = p1
+    phi2, lam2, a21 = ha1_many(phi1, lam1, s12, a12, ellipsoid)
+    return SphereCoords(float(phi2), float(lam2), r), float(a21)
+
+
+# Same call shape as libsphere.ha2, but on the ellipsoid. The radii of p1 and p2 are ignored.
+def ha2(p1: SphereCoords, p2: SphereCoords, ellipsoid: Ellipsoid = WGS84):
+    phi1, lam1, _ = p1
+    phi2, lam2, _ = p2
+    distance, azimuth, reverse_azimuth = ha2_many(phi1, lam1, phi2, lam2, ellipsoid)
+    return float(distance), float(azimuth), float(reverse_azimuth)
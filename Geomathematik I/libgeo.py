@@ -1,12 +1,15 @@
 from math import tau
+from itertools import islice
 import re
+import numpy as np
 
 
+# Normalizes an angle (given in radians) to the range [0, 2pi).
 def clamp_rad(a):
-    while a < 0:
-        a += tau
-    while a >= tau:
-        a -= tau
+    a = a % tau
+    # Tiny negative angles round up to exactly tau.
+    if a >= tau:
+        a = 0.0
     return a
 
 
@@ -121,10 +124,11 @@ def fmt_gon_str(radians: float, precision: int = 3) -> str:
             mm = 0
             dd += 1
 
+    sgn = ""
     if is_negative:
-        dd *= -1
+        sgn = "-"
 
-    return f"{dd:02d}g{mm:02d}'{ss:02f}\""
+    return f"{sgn}{dd:02d}g{mm:02d}'{ss:02.{precision}f}\""
 
 
 # Parses a string formatted as ddgmm'ss" and returns the corresponding angle in radians.
@@ -134,3 +138,239 @@ def parse_gon_str(gon_str: str) -> float:
         raise ValueError("Invalid format. Should be dd°mm'ss\"")
     dd, mm, ss = match.groups()
     return from_gon(float(dd), float(mm), float(ss))
+
+
+"""
+Array versions
+
+The functions below take NumPy arrays or pandas Series (or anything array-like) and
+convert whole columns at once. A Series is returned as a Series with the same index.
+"""
+
+
+def _like(original, values: np.ndarray):
+    # Duck-typed, so that pandas is not needed unless it is already used by the caller.
+    if hasattr(original, "index") and hasattr(original, "to_numpy"):
+        return type(original)(values, index=original.index, name=original.name)
+    return values
+
+
+def clamp_rad_many(a):
+    values = np.mod(np.asarray(a, dtype=float), tau)
+    values = np.where(values >= tau, 0.0, values)
+    return _like(a, values)
+
+
+def from_gon_many(gradians, minutes=0, seconds=0):
+    gons = np.asarray(gradians, dtype=float)
+    sign = np.where(gons < 0, -1.0, 1.0)
+    gons = np.abs(gons) + np.asarray(minutes) / 100 + np.asarray(seconds) / (100 * 100)
+    return _like(gradians, sign * tau * gons / 400)
+
+
+def from_deg_many(degrees, minutes=0, seconds=0):
+    deg = np.asarray(degrees, dtype=float)
+    sign = np.where(deg < 0, -1.0, 1.0)
+    deg = np.abs(deg) + np.asarray(minutes) / 60 + np.asarray(seconds) / (60 * 60)
+    return _like(degrees, sign * tau * deg / 360)
+
+
+def _split_sexagesimal(values: np.ndarray, base: int, precision: int):
+    """Splits absolute values into whole units, minutes and seconds (each in the given base)."""
+    rest = np.abs(values)
+
+    dd = np.floor(rest)
+    rest = (rest - dd) * base
+
+    mm = np.floor(rest)
+    rest = (rest - mm) * base
+
+    ss = np.round(rest, precision)
+    carry = ss >= base
+    ss = np.where(carry, 0.0, ss)
+    mm = mm + carry
+    carry = mm >= base
+    mm = np.where(carry, 0, mm)
+    dd = dd + carry
+
+    return dd.astype(np.int64), mm.astype(np.int64), ss
+
+
+def _fmt_sexagesimal(original, values, base: int, unit: str, precision: int):
+    values = np.asarray(values, dtype=float)
+    # NaN and inf cannot be split into whole units, they are written as "nan".
+    finite = np.isfinite(values)
+    dd, mm, ss = _split_sexagesimal(np.where(finite, values, 0.0), base, precision)
+    sgn = np.where(values < 0, "-", "")
+    template = f"%s%02d{unit}%02d'%02.{precision}f\""
+    columns = (
+        sgn.ravel().tolist(),
+        dd.ravel().tolist(),
+        mm.ravel().tolist(),
+        ss.ravel().tolist(),
+    )
+    strings = [template % row for row in zip(*columns)]
+    for i in np.flatnonzero(~finite.ravel()):
+        strings[i] = "nan"
+    return _like(original, np.array(strings).reshape(values.shape))
+
+
+# Like fmt_deg_str, for a whole array of angles (given in radians).
+def fmt_deg_str_many(radians, precision: int = 3):
+    degrees = np.asarray(radians, dtype=float) / tau * 360
+    return _fmt_sexagesimal(radians, degrees, 60, "°", precision)
+
+
+# Like fmt_gon_str, for a whole array of angles (given in radians).
+def fmt_gon_str_many(radians, precision: int = 3):
+    gradians = np.asarray(radians, dtype=float) / tau * 400
+    return _fmt_sexagesimal(radians, gradians, 100, "g", precision)
+
+
+"""
+Bulk parsing
+
+Field books are exported as text columns in various notations. The parsers below
+recognize the notation of a column from a sample of its rows, parse all rows with one
+precompiled pattern, and report unparsable rows in an error mask instead of raising.
+"""
+
+_NUMBER = r"(\d+(?:[.,]\d*)?)"
+
+# Name -> (pattern, conversion of the matched groups to radians)
+NOTATIONS = {
+    # dd°mm'ss"
+    "deg_dms": (
+        re.compile(rf"\s*(-?)(\d+)°(\d+)'{_NUMBER}\"?\s*"),
+        lambda d, m, s: from_deg(d, m, s),
+    ),
+    # dd°mm.mmm (decimal minutes, e.g. from a handheld GPS)
+    "deg_dm": (
+        re.compile(rf"\s*(-?)(\d+)°{_NUMBER}'?\s*"),
+        lambda d, m: from_deg(d, m),
+    ),
+    # dd.ddd° (decimal degrees, the unit sign is optional)
+    "deg": (
+        re.compile(rf"\s*(-?){_NUMBER}°?\s*"),
+        lambda d: from_deg(d),
+    ),
+    # ddgmm'ss"
+    "gon_dms": (
+        re.compile(rf"\s*(-?)(\d+)g(\d+)'{_NUMBER}\"?\s*"),
+        lambda d, m, s: from_gon(d, m, s),
+    ),
+    # dd.dddg (decimal gradians)
+    "gon": (
+        re.compile(rf"\s*(-?){_NUMBER}g(?:on)?\s*"),
+        lambda d: from_gon(d),
+    ),
+}
+
+
+def _parse(pattern: re.Pattern, convert, text: str) -> float:
+    match = pattern.fullmatch(text)
+    if match is None:
+        return None
+    sign, *numbers = match.groups()
+    value = convert(*(float(n.replace(",", ".")) for n in numbers))
+    return -value if sign else value
+
+
+def detect_notation(strings, sample: int = 100) -> str:
+    """Name of the notation (see NOTATIONS) matching most of the first rows of a column."""
+    rows = [s for s in islice(strings, sample) if s.strip()]
+    counts = {
+        name: sum(pattern.fullmatch(s) is not None for s in rows)
+        for name, (pattern, _) in NOTATIONS.items()
+    }
+    # On a tie the more specific notation wins, which comes first in NOTATIONS.
+    return max(counts, key=lambda name: counts[name])
+
+
+def parse_angles(strings, notation: str = None, fallback: bool = True):
+    """
+    Parses a column of angle strings into radians.
+
+    The notation is detected from the column unless given. Rows which do not match it
+    are tried with the other notations, unless fallback is False, since some exports
+    mix e.g. decimal degrees with degrees and decimal minutes in one column.
+    Returns the values and an error mask. Unparsable rows are NaN and True in the mask.
+    """
+    strings = list(strings)
+    if notation is None:
+        notation = detect_notation(strings)
+    pattern, convert = NOTATIONS[notation]
+    others = [parser for name, parser in NOTATIONS.items() if name != notation]
+
+    parsed = [_parse(pattern, convert, s) for s in strings]
+    if fallback:
+        for i, value in enumerate(parsed):
+            if value is None:
+                for other in others:
+                    value = _parse(*other, strings[i])
+                    if value is not None:
+                        parsed[i] = value
+                        break
+    errors = np.fromiter((v is None for v in parsed), bool, len(parsed))
+    values = np.fromiter(
+        (np.nan if v is None else v for v in parsed), float, len(parsed)
+    )
+    return values, errors
+
+
+def iter_angle_columns(
+    path: str,
+    columns: list[int],
+    delimiter: str = None,
+    chunksize: int = 100_000,
+    comment: str = None,
+    encoding: str = "utf-8",
+    fallback: bool = True,
+):
+    """
+    Reads angle columns from a text file, chunk by chunk.
+
+    The notation of each column is detected from the first chunk and kept for the
+    rest of the file, with a per-row fallback as in parse_angles. Blank lines and
+    lines starting with comment are skipped.
+    Yields a dict column -> (values, errors) per chunk.
+    """
+    notations = {}
+    with open(path, encoding=encoding) as f:
+        lines = (
+            line
+            for line in f
+            if line.strip() and not (comment and line.lstrip().startswith(comment))
+        )
+        while True:
+            chunk = list(islice(lines, chunksize))
+            if not chunk:
+                break
+
+            rows = [line.split(delimiter) for line in chunk]
+            result = {}
+            for column in columns:
+                strings = [row[column] if column < len(row) else "" for row in rows]
+                if column not in notations:
+                    notations[column] = detect_notation(strings)
+                result[column] = parse_angles(strings, notations[column], fallback)
+            yield result
+
+
+def read_angle_columns(path: str, columns: list[int], **kwargs):
+    """
+    Like iter_angle_columns, but reads the whole file.
+    Returns a dict column -> (values, errors).
+    """
+    parts = {column: ([], []) for column in columns}
+    for chunk in iter_angle_columns(path, columns, **kwargs):
+        for column, (values, errors) in chunk.items():
+            parts[column][0].append(values)
+            parts[column][1].append(errors)
+    return {
+        column: (
+            np.concatenate(values) if values else np.empty(0),
+            np.concatenate(errors) if errors else np.empty(0, dtype=bool),
+        )
+        for column, (values, errors) in parts.items()
+    }
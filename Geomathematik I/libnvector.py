@@ -0,0 +1,186 @@
+"""
+Geodetic main problems on the sphere, computed with n-vectors (unit position vectors).
+
+Instead of pole triangles, distances and azimuths are taken from atan2 of vector
+components, and great circles are intersected by cross products. There are no special
+cases for meridians or azimuths of 0 and pi, and the accuracy does not degrade near the
+poles or antipodes. All functions work on arrays, which are broadcast against each other.
+
+libsphere uses these functions when its backend is set to "nvector".
+"""
+
+from __future__ import annotations
+from math import tau
+import numpy as np
+
+
+def to_nvector(phi: np.ndarray, lam: np.ndarray) -> np.ndarray:
+    cos_phi = np.cos(phi)
+    return np.stack(
+        [cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)], axis=-1
+    )
+
+
+def from_nvector(n: np.ndarray):
+    phi = np.arctan2(n[..., 2], np.hypot(n[..., 0], n[..., 1]))
+    lam = np.arctan2(n[..., 1], n[..., 0])
+    return phi, lam
+
+
+def _frame(phi: np.ndarray, lam: np.ndarray):
+    """Unit vectors pointing north and east at the given positions."""
+    sin_phi, cos_phi = np.sin(phi), np.cos(phi)
+    sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+    north = np.stack([-sin_phi * cos_lam, -sin_phi * sin_lam, cos_phi], axis=-1)
+    east = np.stack([-sin_lam, cos_lam, np.zeros_like(lam)], axis=-1)
+    return north, east
+
+
+def _dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sum(a * b, axis=-1)
+
+
+def _direction(north: np.ndarray, east: np.ndarray, azimuth: np.ndarray) -> np.ndarray:
+    return np.cos(azimuth)[..., None] * north + np.sin(azimuth)[..., None] * east
+
+
+# ha1_many and ha2_many work in the frame rotated by -lam1 about the z-axis, where P1 lies
+# in the x-z plane: n1 = (cos phi1, 0, sin phi1), north = (-sin phi1, 0, cos phi1) and
+# east = (0, 1, 0). Written out in components, only a few trigonometric functions remain.
+
+
+def ha1_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    s12: np.ndarray,
+    a12: np.ndarray,
+    r: float = 1,
+):
+    """Direct problem, returns the arrays phi2, lam2 and the reverse azimuth a21."""
+    phi1, lam1, s12, a12 = np.broadcast_arrays(*map(np.asarray, (phi1, lam1, s12, a12)))
+    sin_phi1, cos_phi1 = np.sin(phi1), np.cos(phi1)
+    sin_s, cos_s = np.sin(s12 / r), np.cos(s12 / r)
+    sin_a, cos_a = np.sin(a12), np.cos(a12)
+
+    # Move along the great circle: n2 = cos(s) n1 + sin(s) d, with the direction
+    # d = cos(a12) north + sin(a12) east
+    x = cos_s * cos_phi1 - sin_s * cos_a * sin_phi1
+    y = sin_s * sin_a
+    z = cos_s * sin_phi1 + sin_s * cos_a * cos_phi1
+    horizontal = np.hypot(x, y)
+    phi2 = np.arctan2(z, horizontal)
+    dlam = np.arctan2(y, x)
+
+    # Direction back to P1 at P2: v = sin(s) n1 - cos(s) d
+    vx = sin_s * cos_phi1 + cos_s * cos_a * sin_phi1
+    vy = -cos_s * sin_a
+    vz = sin_s * sin_phi1 - cos_s * cos_a * cos_phi1
+    # Local frame at P2 (at the poles, the direction of lam2 defines north)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_dlam = np.where(horizontal > 0, x / horizontal, 1.0)
+        sin_dlam = np.where(horizontal > 0, y / horizontal, 0.0)
+    east = -vx * sin_dlam + vy * cos_dlam
+    north = -(vx * cos_dlam + vy * sin_dlam) * z + vz * horizontal
+    a21 = np.mod(np.arctan2(east, north), tau)
+
+    return phi2, lam1 + dlam, a21
+
+
+def ha2_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    phi2: np.ndarray,
+    lam2: np.ndarray,
+    r: float = 1,
+):
+    """Inverse problem, returns the arrays distance, azimuth and reverse azimuth."""
+    phi1, lam1, phi2, lam2 = np.broadcast_arrays(
+        *map(np.asarray, (phi1, lam1, phi2, lam2))
+    )
+    sin_phi1, cos_phi1 = np.sin(phi1), np.cos(phi1)
+    sin_phi2, cos_phi2 = np.sin(phi2), np.cos(phi2)
+    dlam = lam2 - lam1
+    sin_dlam, cos_dlam = np.sin(dlam), np.cos(dlam)
+
+    # Components of n2 along east and north at P1, and of n1 along east and north at P2
+    east1 = cos_phi2 * sin_dlam
+    north1 = cos_phi1 * sin_phi2 - sin_phi1 * cos_phi2 * cos_dlam
+    east2 = -cos_phi1 * sin_dlam
+    north2 = cos_phi2 * sin_phi1 - sin_phi2 * cos_phi1 * cos_dlam
+
+    # The tangential part of n2 at P1 has the length sin(s), n1 . n2 is cos(s)
+    cos_s = sin_phi1 * sin_phi2 + cos_phi1 * cos_phi2 * cos_dlam
+    distance = np.arctan2(np.hypot(east1, north1), cos_s) * r
+
+    azimuth = np.mod(np.arctan2(east1, north1), tau)
+    reverse_azimuth = np.mod(np.arctan2(east2, north2), tau)
+    return distance, azimuth, reverse_azimuth
+
+
+def vws_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    phi2: np.ndarray,
+    lam2: np.ndarray,
+    a13: np.ndarray,
+    a23: np.ndarray,
+):
+    """
+    Intersection of the great circles leaving P1 and P2 with the azimuths a13 and a23.
+
+    Of the two intersections, the one ahead of both rays is returned. Identical great
+    circles give NaN. Returns the arrays phi3, lam3.
+    """
+    phi1, lam1, phi2, lam2, a13, a23 = np.broadcast_arrays(
+        *map(np.asarray, (phi1, lam1, phi2, lam2, a13, a23))
+    )
+    n1 = to_nvector(phi1, lam1)
+    n2 = to_nvector(phi2, lam2)
+    d1 = _direction(*_frame(phi1, lam1), a13)
+    d2 = _direction(*_frame(phi2, lam2), a23)
+
+    # The normals of both great circles are perpendicular to their intersections.
+    c = np.cross(np.cross(n1, d1), np.cross(n2, d2))
+    length = np.linalg.norm(c, axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = np.where(length > 1e-15, c / length, np.nan)
+
+    ahead = np.sign(_dot(c, d1) + _dot(c, d2))
+    return from_nvector(np.where(ahead[..., None] < 0, -c, c))
+
+
+def bgs_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    phi2: np.ndarray,
+    lam2: np.ndarray,
+    s13: np.ndarray,
+    s23: np.ndarray,
+    r: float = 1,
+):
+    """
+    Intersection of the small circles with the radii s13 around P1 and s23 around P2.
+
+    Like libsphere.bgs, the intersection left of the direction P1 -> P2 is returned.
+    Circles which do not intersect give NaN. Returns the arrays phi3, lam3.
+    """
+    phi1, lam1, phi2, lam2, s13, s23 = np.broadcast_arrays(
+        *map(np.asarray, (phi1, lam1, phi2, lam2, s13, s23))
+    )
+    n1 = to_nvector(phi1, lam1)
+    n2 = to_nvector(phi2, lam2)
+    cos13, cos23 = np.cos(s13 / r), np.cos(s23 / r)
+
+    # n3 = x n1 + y n2 + z (n1 x n2), with n3 . n1 = cos13 and n3 . n2 = cos23
+    c12 = _dot(n1, n2)
+    normal = np.cross(n1, n2)
+    sin2_12 = _dot(normal, normal)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (cos13 - c12 * cos23) / sin2_12
+        y = (cos23 - c12 * cos13) / sin2_12
+        z2 = (1 - (x**2 + y**2 + 2 * x * y * c12)) / sin2_12
+    # Touching circles can give slightly negative values from rounding
+    z = np.sqrt(np.where(z2 < -1e-12, np.nan, np.maximum(z2, 0)))
+
+    n3 = x[..., None] * n1 + y[..., None] * n2 + z[..., None] * normal
+    return from_nvector(n3)
@@ -1,8 +1,12 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from functools import wraps
 from math import asin, atan2, cos, degrees, radians, sin, pi, sqrt, atan, tau
+import numpy as np
 from lib3d import Vec3
 from libgeo import fmt_deg_str, clamp_rad
+import libnvector
 
 
 def _cosineRuleForSides(a: float, b: float, gamma: float):
@@ -93,6 +97,186 @@ def _helper(a: float, c: float, alpha: float, gamma: float):
     )
 
 
+# Array versions of the helpers above. They take NumPy arrays (or anything broadcastable)
+# and solve all triangles in one pass. Instead of raising, invalid triangles produce NaN.
+
+
+def _cosineRuleForSides_batch(a: np.ndarray, b: np.ndarray, gamma: np.ndarray):
+    return 2 * np.arctan(
+        np.sqrt(
+            np.sin((a - b) / 2) ** 2 + np.sin(a) * np.sin(b) * np.sin(gamma / 2) ** 2
+        )
+        / np.sqrt(
+            np.cos((a + b) / 2) ** 2 + np.sin(a) * np.sin(b) * np.cos(gamma / 2) ** 2
+        )
+    )
+
+
+def _cosineRuleForAngles_batch(c: np.ndarray, alpha: np.ndarray, beta: np.ndarray):
+    sa, sb = np.sin(alpha), np.sin(beta)
+    return 2 * np.arctan(
+        np.sqrt(np.cos((alpha + beta) / 2) ** 2 + sa * sb * np.sin(c / 2) ** 2)
+        / np.sqrt(np.sin((alpha - beta) / 2) ** 2 + sa * sb * np.cos(c / 2) ** 2)
+    )
+
+
+def _halfSideFormula_batch(alpha: np.ndarray, beta: np.ndarray, gamma: np.ndarray):
+    rho = (alpha + beta + gamma) / 2
+    cr = np.cos(rho)
+    cra = np.cos(rho - alpha)
+    crb = np.cos(rho - beta)
+    crg = np.cos(rho - gamma)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = 2 * np.arctan(1 / np.sqrt(crb * crg / (-cr * cra)))
+        b = 2 * np.arctan(1 / np.sqrt(cra * crg / (-cr * crb)))
+        c = 2 * np.arctan(1 / np.sqrt(cra * crb / (-cr * crg)))
+    return a, b, c
+
+
+def _halfAngleFormula_batch(a: np.ndarray, b: np.ndarray, c: np.ndarray):
+    s = (a + b + c) / 2
+    ss = np.sin(s)
+    ssa = np.sin(s - a)
+    ssb = np.sin(s - b)
+    ssc = np.sin(s - c)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha = np.where(ssa == 0, pi, 2 * np.arctan(np.sqrt(ssb * ssc / (ss * ssa))))
+        beta = np.where(ssb == 0, pi, 2 * np.arctan(np.sqrt(ssa * ssc / (ss * ssb))))
+        gamma = np.where(ssc == 0, pi, 2 * np.arctan(np.sqrt(ssa * ssb / (ss * ssc))))
+
+    # Triangle inequality violated: One side is longer than the other two combined.
+    violated = (a > s) | (b > s) | (c > s)
+    alpha = np.where(violated, np.nan, alpha)
+    beta = np.where(violated, np.nan, beta)
+    gamma = np.where(violated, np.nan, gamma)
+
+    return alpha, beta, gamma
+
+
+def _helper_batch(a: np.ndarray, c: np.ndarray, alpha: np.ndarray, gamma: np.ndarray):
+    sa, sc = np.sin(a), np.sin(c)
+    return 2 * np.arctan(
+        np.sqrt(np.sin((a - c) / 2) ** 2 + sa * sc * np.cos((alpha + gamma) / 2) ** 2)
+        / np.sqrt(np.cos((a + c) / 2) ** 2 + sa * sc * np.sin((alpha - gamma) / 2) ** 2)
+    )
+
+
+# Optional bounded LRU cache for the scalar solvers (ha1, ha2 and the SphereTriangle
+# constructors). Results are keyed on the exact input values, so repeated evaluations
+# between the same fixed stations skip the trigonometry. Disabled by default.
+class GeodesicCache:
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"GeodesicCache(hits={self.hits}, misses={self.misses}, size={len(self)}/{self.maxsize})"
+
+    def get(self, key, compute):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            value = self._entries[key] = compute()
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, point: SphereCoords):
+        """Drop all entries computed from the given point."""
+        coords = (point.phi, point.lam, point.r)
+        for key in [k for k in self._entries if coords in k]:
+            del self._entries[key]
+
+
+_cache: GeodesicCache = None
+
+
+def enable_cache(maxsize: int = 4096) -> GeodesicCache:
+    global _cache
+    _cache = GeodesicCache(maxsize)
+    return _cache
+
+
+def disable_cache():
+    global _cache
+    _cache = None
+
+
+# Backend of ha1, ha2, vws, bgs and their array versions:
+#   "triangle": pole triangles (default)
+#   "nvector": n-vectors, see libnvector. No special cases at the poles, along meridians
+#              or near antipodes, and vws/bgs do not need a triangle solution.
+_backend = "triangle"
+_BACKENDS = ("triangle", "nvector")
+
+
+def set_backend(name: str):
+    global _backend
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {_BACKENDS}")
+    # Cached results were computed by the other backend
+    if _cache is not None and name != _backend:
+        _cache.clear()
+    _backend = name
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def _copy(value):
+    # Cached results must not be shared with callers, since SphereCoords and
+    # SphereTriangle are mutable.
+    t = type(value)
+    if t is float:
+        return value
+    if t is tuple or t is list:
+        return t(map(_copy, value))
+    if t is SphereCoords:
+        return SphereCoords(value.phi, value.lam, value.r)
+    if t is SphereTriangle:
+        return replace(value)
+    return value
+
+
+def _key(arg):
+    if type(arg) is SphereCoords:
+        return (arg.phi, arg.lam, arg.r)
+    return arg
+
+
+def _cached(f):
+    """Looks up calls of f in the cache (if enabled). SphereCoords are keyed by their values."""
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if _cache is None:
+            return f(*args, **kwargs)
+
+        key = (f, *map(_key, args), *kwargs.items())
+        return _copy(_cache.get(key, lambda: f(*args, **kwargs)))
+
+    return wrapper
+
+
 # A spherical triangle is created from the intersection of 3 great circles
 # on a unit sphere. All angles and sides are given in radians.
 @dataclass
@@ -123,6 +307,7 @@ class SphereTriangle:
         return SphereTriangle.sss(a, b, c)
 
     @classmethod
+    @_cached
     def sws(
         SphereTriangle,
         a: float,
@@ -134,6 +319,7 @@ class SphereTriangle:
         return SphereTriangle(a, b, c, alpha, beta, gamma)
 
     @classmethod
+    @_cached
     def wsw(
         SphereTriangle,
         alpha: float,
@@ -145,6 +331,7 @@ class SphereTriangle:
         return SphereTriangle(a, b, c, alpha, beta, gamma)
 
     @classmethod
+    @_cached
     def ssw(
         SphereTriangle,
         a: float,
@@ -175,6 +362,7 @@ class SphereTriangle:
         return solutions
 
     @classmethod
+    @_cached
     def wws(
         SphereTriangle,
         alpha: float,
@@ -205,6 +393,7 @@ class SphereTriangle:
         return solutions
 
     @classmethod
+    @_cached
     def sss(
         SphereTriangle,
         a: float,
@@ -215,6 +404,7 @@ class SphereTriangle:
         return SphereTriangle(a, b, c, alpha, beta, gamma)
 
     @classmethod
+    @_cached
     def www(
         SphereTriangle,
         alpha: float,
@@ -224,6 +414,161 @@ class SphereTriangle:
         a, b, c = _halfSideFormula(alpha, beta, gamma)
         return SphereTriangle(a, b, c, alpha, beta, gamma)
 
+    # Batch variants of the constructors above.
+    # They take arrays (or scalars, broadcast against each other) and return a
+    # SphereTriangleArray. Triangles which can not be solved are marked in its `valid` mask.
+
+    @classmethod
+    def sws_batch(
+        SphereTriangle,
+        a: np.ndarray,
+        b: np.ndarray,
+        gamma: np.ndarray,
+    ) -> SphereTriangleArray:
+        a, b, gamma = np.broadcast_arrays(*map(np.asarray, (a, b, gamma)))
+        c = _cosineRuleForSides_batch(a, b, gamma)
+        alpha, beta, _ = _halfAngleFormula_batch(a, b, c)
+        return SphereTriangleArray.from_arrays(a, b, c, alpha, beta, gamma)
+
+    @classmethod
+    def wsw_batch(
+        SphereTriangle,
+        alpha: np.ndarray,
+        beta: np.ndarray,
+        c: np.ndarray,
+    ) -> SphereTriangleArray:
+        alpha, beta, c = np.broadcast_arrays(*map(np.asarray, (alpha, beta, c)))
+        gamma = _cosineRuleForAngles_batch(c, alpha, beta)
+        a, b, _ = _halfSideFormula_batch(alpha, beta, gamma)
+        return SphereTriangleArray.from_arrays(a, b, c, alpha, beta, gamma)
+
+    @classmethod
+    def ssw_batch(
+        SphereTriangle,
+        a: np.ndarray,
+        c: np.ndarray,
+        alpha: np.ndarray,
+    ) -> SphereTriangleArray:
+        """
+        Solves the ambiguous case for all inputs at once.
+
+        The result has an extra trailing axis of length 2 holding both candidate solutions,
+        use the `valid` mask to pick those that actually exist.
+        """
+        a, c, alpha = np.broadcast_arrays(*map(np.asarray, (a, c, alpha)))
+        with np.errstate(invalid="ignore"):
+            gamma = np.arcsin(np.sin(c) * np.sin(alpha) / np.sin(a))
+
+        # Both solutions side by side: gamma and pi - gamma
+        gamma = np.stack([gamma, pi - gamma], axis=-1)
+        a, c, alpha = a[..., None], c[..., None], alpha[..., None]
+
+        b = _helper_batch(a, c, alpha, gamma)
+        alpha_, beta, gamma_ = _halfAngleFormula_batch(a, b, c)
+
+        # Same tolerance as the scalar version.
+        valid = (np.abs(alpha - alpha_) < 1e-2) & (np.abs(gamma - gamma_) < 1e-2)
+        return SphereTriangleArray.from_arrays(a, b, c, alpha, beta, gamma, valid)
+
+    @classmethod
+    def wws_batch(
+        SphereTriangle,
+        alpha: np.ndarray,
+        gamma: np.ndarray,
+        a: np.ndarray,
+    ) -> SphereTriangleArray:
+        """
+        Solves the ambiguous case for all inputs at once.
+
+        The result has an extra trailing axis of length 2 holding both candidate solutions,
+        use the `valid` mask to pick those that actually exist.
+        """
+        alpha, gamma, a = np.broadcast_arrays(*map(np.asarray, (alpha, gamma, a)))
+        with np.errstate(invalid="ignore"):
+            c = np.arcsin(np.sin(a) / np.sin(alpha) * np.sin(gamma))
+
+        # Both solutions side by side: c and pi - c
+        c = np.stack([c, pi - c], axis=-1)
+        alpha, gamma, a = alpha[..., None], gamma[..., None], a[..., None]
+
+        b = _helper_batch(a, c, alpha, gamma)
+        alpha_, beta, gamma_ = _halfAngleFormula_batch(a, b, c)
+
+        # Same tolerance as the scalar version.
+        valid = (np.abs(alpha - alpha_) < 1e-6) & (np.abs(gamma - gamma_) < 1e-6)
+        return SphereTriangleArray.from_arrays(a, b, c, alpha, beta, gamma, valid)
+
+    @classmethod
+    def sss_batch(
+        SphereTriangle,
+        a: np.ndarray,
+        b: np.ndarray,
+        c: np.ndarray,
+    ) -> SphereTriangleArray:
+        a, b, c = np.broadcast_arrays(*map(np.asarray, (a, b, c)))
+        alpha, beta, gamma = _halfAngleFormula_batch(a, b, c)
+        return SphereTriangleArray.from_arrays(a, b, c, alpha, beta, gamma)
+
+    @classmethod
+    def www_batch(
+        SphereTriangle,
+        alpha: np.ndarray,
+        beta: np.ndarray,
+        gamma: np.ndarray,
+    ) -> SphereTriangleArray:
+        alpha, beta, gamma = np.broadcast_arrays(*map(np.asarray, (alpha, beta, gamma)))
+        a, b, c = _halfSideFormula_batch(alpha, beta, gamma)
+        return SphereTriangleArray.from_arrays(a, b, c, alpha, beta, gamma)
+
+
+# Many spherical triangles at once, stored as one array per side and angle
+# (struct of arrays). Entries that could not be solved are False in `valid`.
+@dataclass
+class SphereTriangleArray:
+    a: np.ndarray
+    b: np.ndarray
+    c: np.ndarray
+    alpha: np.ndarray
+    beta: np.ndarray
+    gamma: np.ndarray
+    valid: np.ndarray
+
+    @classmethod
+    def from_arrays(
+        SphereTriangleArray,
+        a: np.ndarray,
+        b: np.ndarray,
+        c: np.ndarray,
+        alpha: np.ndarray,
+        beta: np.ndarray,
+        gamma: np.ndarray,
+        valid: np.ndarray = None,
+    ) -> SphereTriangleArray:
+        a, b, c, alpha, beta, gamma = np.broadcast_arrays(a, b, c, alpha, beta, gamma)
+        finite = np.isfinite(a) & np.isfinite(b) & np.isfinite(c)
+        finite &= np.isfinite(alpha) & np.isfinite(beta) & np.isfinite(gamma)
+        valid = finite if valid is None else (valid & finite)
+        return SphereTriangleArray(a, b, c, alpha, beta, gamma, valid)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.valid.shape
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def __getitem__(self, index) -> SphereTriangle | SphereTriangleArray:
+        fields = (self.a, self.b, self.c, self.alpha, self.beta, self.gamma)
+        if np.ndim(self.valid[index]) == 0:
+            return SphereTriangle(*(float(f[index]) for f in fields))
+        return SphereTriangleArray(*(f[index] for f in fields), self.valid[index])
+
+    def excess(self) -> np.ndarray:
+        return self.alpha + self.beta + self.gamma - pi
+
+    def area(self, radius=1) -> np.ndarray:
+        return self.excess() * radius**2
+
 
 # Holds spherical coordinates as latitude and longitude.
 # Can convert to and from Vec3.
@@ -290,19 +635,256 @@ class SphereCoords:
 
     @classmethod
     def centroid(SphereCoords, points: list[SphereCoords]):
-        p = Vec3(0, 0, 0)
+        return SphereCoordsArray.from_coords(points).centroid()
+
+
+# Many spherical coordinates, stored column-wise as contiguous float64 arrays.
+# Behaves like a list of SphereCoords (indexing, slicing, iteration), but all
+# conversions work on whole columns at once.
+class SphereCoordsArray:
+    phi: np.ndarray  # aka latitude
+    lam: np.ndarray  # aka longitude
+    r: np.ndarray  # radius
+
+    def __init__(self, phi: np.ndarray, lam: np.ndarray, r: np.ndarray = 1):
+        phi, lam, r = np.broadcast_arrays(
+            np.asarray(phi, dtype=np.float64),
+            np.asarray(lam, dtype=np.float64),
+            np.asarray(r, dtype=np.float64),
+        )
+        self.phi = np.ascontiguousarray(phi)
+        self.lam = np.ascontiguousarray(lam)
+        self.r = np.ascontiguousarray(r)
 
-        for point in points:
-            p += point.to_vec3()
+    @classmethod
+    def from_coords(SphereCoordsArray, points: list[SphereCoords]):
+        return SphereCoordsArray(
+            np.fromiter((p.phi for p in points), np.float64, len(points)),
+            np.fromiter((p.lam for p in points), np.float64, len(points)),
+            np.fromiter((p.r for p in points), np.float64, len(points)),
+        )
 
-        p /= len(points)
+    def __repr__(self) -> str:
+        return f"SphereCoordsArray({len(self)} points)"
+
+    def __len__(self) -> int:
+        return len(self.phi)
+
+    def __getitem__(self, index) -> SphereCoords | SphereCoordsArray:
+        if np.ndim(self.phi[index]) == 0:
+            return SphereCoords(
+                float(self.phi[index]), float(self.lam[index]), float(self.r[index])
+            )
+        return SphereCoordsArray(self.phi[index], self.lam[index], self.r[index])
+
+    def __iter__(self):
+        for phi, lam, r in zip(self.phi.tolist(), self.lam.tolist(), self.r.tolist()):
+            yield SphereCoords(phi, lam, r)
+
+    def lat(self) -> np.ndarray:
+        return np.degrees(self.phi)
+
+    def lon(self) -> np.ndarray:
+        return np.degrees(self.lam)
+
+    def to_vec3(self) -> np.ndarray:
+        """Cartesian coordinates of all points, as an array of shape (N, 3)."""
+        cos_phi = np.cos(self.phi)
+        return np.stack(
+            [
+                self.r * cos_phi * np.cos(self.lam),
+                self.r * cos_phi * np.sin(self.lam),
+                self.r * np.sin(self.phi),
+            ],
+            axis=-1,
+        )
 
-        return SphereCoords.from_vec3(p)
+    @classmethod
+    def from_vec3(SphereCoordsArray, p: np.ndarray):
+        p = np.asarray(p, dtype=np.float64)
+        r = np.linalg.norm(p, axis=-1)
+        x, y, z = p[..., 0], p[..., 1], p[..., 2]
+
+        # See SphereCoords.from_vec3
+        phi = np.arcsin(z / r)
+        lam = np.arctan2(y, x)
+
+        return SphereCoordsArray(phi, lam, r)
+
+    def centroid(self, weights: np.ndarray = None) -> SphereCoords:
+        """
+        Mean of the cartesian positions, converted back to spherical coordinates.
+        Like SphereCoords.centroid, the resulting radius is the length of the mean vector.
+        """
+        p = np.average(self.to_vec3(), axis=0, weights=weights)
+        return SphereCoords.from_vec3(Vec3(*p.tolist()))
+
+
+# Spatial index over a fixed set of points on the sphere, for nearest-neighbour and
+# radius queries without comparing against every point.
+#
+# The points are sorted into latitude bands, and within each band by longitude.
+# A query only looks at the bands and longitude ranges overlapping the spherical cap
+# around the query point, and then computes exact geodesic distances for those candidates.
+class SphereIndex:
+    r: float
+    phi: np.ndarray  # sorted by band and longitude
+    lam: np.ndarray
+    vec: np.ndarray  # unit vectors, shape (N, 3)
+    order: np.ndarray  # position in the sorted arrays -> index of the original point
+    band_height: float
+    band_offsets: np.ndarray
+
+    def __init__(
+        self,
+        phi: np.ndarray,
+        lam: np.ndarray,
+        r: float = 1,
+        bands: int = None,
+    ):
+        phi = np.asarray(phi, dtype=float)
+        lam = np.mod(np.asarray(lam, dtype=float) + pi, tau) - pi
+
+        if bands is None:
+            bands = int(np.clip(np.sqrt(len(phi) / 2), 1, 4096))
+        self.band_height = pi / bands
+
+        band = np.minimum(((phi + pi / 2) / self.band_height).astype(int), bands - 1)
+        self.order = np.lexsort((lam, band))
+        self.band_offsets = np.searchsorted(band[self.order], np.arange(bands + 1))
 
+        self.r = r
+        self.phi = phi[self.order]
+        self.lam = lam[self.order]
+        self.vec = np.stack(
+            [
+                np.cos(self.phi) * np.cos(self.lam),
+                np.cos(self.phi) * np.sin(self.lam),
+                np.sin(self.phi),
+            ],
+            axis=-1,
+        )
+
+    @classmethod
+    def from_coords(SphereIndex, points: list[SphereCoords], bands: int = None):
+        return SphereIndex.from_array(SphereCoordsArray.from_coords(points), bands)
 
+    @classmethod
+    def from_array(SphereIndex, points: SphereCoordsArray, bands: int = None):
+        r = points.r[0] if len(points) else 1
+        return SphereIndex(points.phi, points.lam, r, bands)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _candidates(self, phi: float, lam: float, radius: float) -> np.ndarray:
+        """Positions (in the sorted arrays) of all points which might be within the angle radius."""
+        bands = len(self.band_offsets) - 1
+        lo = int(max((phi - radius + pi / 2) / self.band_height, 0))
+        hi = int(min((phi + radius + pi / 2) / self.band_height, bands - 1))
+
+        # Longitude extent of the cap, unless it contains a pole.
+        if radius >= pi / 2 - abs(phi):
+            intervals = [(-pi, pi)]
+        else:
+            dlam = asin(sin(radius) / cos(phi))
+            lam = (lam + pi) % tau - pi
+            lam_lo, lam_hi = lam - dlam, lam + dlam
+            if lam_lo < -pi:
+                intervals = [(-pi, lam_hi), (lam_lo + tau, pi)]
+            elif lam_hi > pi:
+                intervals = [(-pi, lam_hi - tau), (lam_lo, pi)]
+            else:
+                intervals = [(lam_lo, lam_hi)]
+
+        ranges = []
+        for b in range(lo, hi + 1):
+            start, end = self.band_offsets[b], self.band_offsets[b + 1]
+            band_lam = self.lam[start:end]
+            for lam_lo, lam_hi in intervals:
+                i = start + np.searchsorted(band_lam, lam_lo, side="left")
+                j = start + np.searchsorted(band_lam, lam_hi, side="right")
+                if i < j:
+                    ranges.append(np.arange(i, j))
+
+        if not ranges:
+            return np.empty(0, dtype=int)
+        return np.concatenate(ranges)
+
+    def _distances(self, phi: float, lam: float, positions: np.ndarray) -> np.ndarray:
+        """Exact geodesic angle between the query point and the points at the given positions."""
+        q = np.array([cos(phi) * cos(lam), cos(phi) * sin(lam), sin(phi)])
+        v = self.vec[positions]
+        return np.arctan2(np.linalg.norm(np.cross(v, q), axis=-1), v @ q)
+
+    def within(self, point: SphereCoords, radius: float):
+        """
+        All points within the geodesic distance radius of the given point.
+
+        Returns the indices of the points (in bulk loading order) and their distances,
+        sorted by distance.
+        """
+        phi, lam, _ = point
+        angle = radius / self.r
+        positions = self._candidates(phi, lam, angle)
+        distances = self._distances(phi, lam, positions)
+
+        inside = distances <= angle
+        positions, distances = positions[inside], distances[inside]
+        by_distance = np.argsort(distances, kind="stable")
+        return self.order[positions[by_distance]], distances[by_distance] * self.r
+
+    def nearest(self, point: SphereCoords, k: int = 1):
+        """
+        The k points closest to the given point.
+
+        Returns the indices of the points (in bulk loading order) and their distances,
+        sorted by distance.
+        """
+        phi, lam, _ = point
+        k = min(k, len(self))
+
+        # Start with a cap which should contain about k points if they were spread evenly,
+        # and grow it until it does. Everything outside the cap is farther away than
+        # everything inside, so the k closest points within the cap are the k nearest.
+        angle = min(1.5 * sqrt(4 * max(k, 1) / max(len(self), 1)), pi)
+        while True:
+            positions = self._candidates(phi, lam, angle)
+            distances = self._distances(phi, lam, positions)
+            inside = distances <= angle
+            if inside.sum() >= k or angle >= pi:
+                break
+            angle = min(2 * angle, pi)
+
+        positions, distances = positions[inside], distances[inside]
+        by_distance = np.argsort(distances, kind="stable")[:k]
+        return self.order[positions[by_distance]], distances[by_distance] * self.r
+
+    def nearest_many(self, phi: np.ndarray, lam: np.ndarray, k: int = 1):
+        """
+        k nearest points for each of the given query points.
+
+        Returns two arrays of shape (Q, k) with the indices and distances.
+        """
+        phi, lam = np.broadcast_arrays(np.atleast_1d(phi), np.atleast_1d(lam))
+        k = min(k, len(self))
+        indices = np.empty((len(phi), k), dtype=int)
+        distances = np.empty((len(phi), k))
+        for q in range(len(phi)):
+            indices[q], distances[q] = self.nearest(
+                SphereCoords(phi[q], lam[q], self.r), k
+            )
+        return indices, distances
+
+
+@_cached
 def ha1(p1: SphereCoords, s12: float, a12: float):
     phi1, lam1, r = p1
 
+    if _backend == "nvector":
+        phi2, lam2, a21 = libnvector.ha1_many(phi1, lam1, s12, a12, r)
+        return SphereCoords(float(phi2), float(lam2), r), float(a21)
+
     a12 = clamp_rad(a12)
 
     if a12 == 0:
@@ -350,12 +932,22 @@ def ha1(p1: SphereCoords, s12: float, a12: float):
     return p2, a21
 
 
+@_cached
 def ha2(p1: SphereCoords, p2: SphereCoords):
     phi1, lam1, r1 = p1
     phi2, lam2, r2 = p2
     assert r1 == r2
 
-    if lam1 == lam2:
+    if _backend == "nvector":
+        distance, azimuth, reverse_azimuth = libnvector.ha2_many(
+            phi1, lam1, phi2, lam2, r1
+        )
+        return float(distance), float(azimuth), float(reverse_azimuth)
+
+    # Longitude difference in (-pi, pi], so that pairs across the antimeridian go the short way.
+    dlam = (lam2 - lam1 + pi) % tau - pi
+
+    if dlam == 0:
         distance = abs(phi1 - phi2) * r1
         if phi1 < phi2:
             azimuth = 0
@@ -369,11 +961,11 @@ def ha2(p1: SphereCoords, p2: SphereCoords):
         T = SphereTriangle.sws(
             a=pi / 2 - phi1,
             b=pi / 2 - phi2,
-            gamma=lam2 - lam1,
+            gamma=dlam,
         )
         distance = T.c * r1
 
-        if lam1 < lam2:
+        if dlam > 0:
             azimuth = T.beta
             reverse_azimuth = tau - T.alpha
         else:
@@ -383,6 +975,95 @@ def ha2(p1: SphereCoords, p2: SphereCoords):
     return distance, azimuth, reverse_azimuth
 
 
+def ha1_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    s12: np.ndarray,
+    a12: np.ndarray,
+    r: float = 1,
+):
+    """
+    Direct problem (like ha1) for arrays of start points, distances and azimuths.
+
+    All inputs are broadcast against each other, so e.g. one start point with an array of
+    distances densifies a track. Returns the arrays phi2, lam2 and the reverse azimuth a21.
+    """
+    if _backend == "nvector":
+        return libnvector.ha1_many(phi1, lam1, s12, a12, r)
+
+    phi1, lam1, s12, a12 = np.broadcast_arrays(*map(np.asarray, (phi1, lam1, s12, a12)))
+    a12 = np.mod(a12, tau)
+    s = s12 / r
+
+    north = a12 == 0
+    south = a12 == pi
+    east = a12 < pi
+
+    # Both remaining cases are the same pole triangle, only mirrored:
+    # the side towards P2 and the angle at the pole swap places.
+    T = SphereTriangle.sws_batch(
+        a=pi / 2 - phi1,
+        b=s,
+        gamma=np.where(east, a12, tau - a12),
+    )
+    phi2 = pi / 2 - T.c
+    lam2 = np.where(east, lam1 + T.beta, lam1 - T.beta)
+    a21 = np.where(east, tau - T.alpha, T.alpha)
+
+    # Along the meridian
+    phi2 = np.where(north, phi1 + s, np.where(south, phi1 - s, phi2))
+    lam2 = np.where(north | south, lam1, lam2)
+    a21 = np.where(north, pi, np.where(south, 0.0, a21))
+
+    return phi2, lam2, a21
+
+
+def ha2_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    phi2: np.ndarray,
+    lam2: np.ndarray,
+    r: float = 1,
+):
+    """
+    Inverse problem (like ha2) for arrays of point pairs.
+
+    All inputs are broadcast against each other, so passing column and row vectors
+    (e.g. phi[:, None] and phi[None, :]) gives an all-pairs distance matrix.
+    Returns the arrays distance, azimuth and reverse azimuth.
+    """
+    if _backend == "nvector":
+        return libnvector.ha2_many(phi1, lam1, phi2, lam2, r)
+
+    phi1, lam1, phi2, lam2 = np.broadcast_arrays(
+        *map(np.asarray, (phi1, lam1, phi2, lam2))
+    )
+
+    # Longitude difference in (-pi, pi], so that "east" really means the shorter way east.
+    dlam = np.mod(lam2 - lam1 + pi, tau) - pi
+    dlam = np.where(dlam == -pi, pi, dlam)
+    east = dlam > 0
+
+    # Pole Triangle
+    T = SphereTriangle.sws_batch(
+        a=pi / 2 - phi1,
+        b=pi / 2 - phi2,
+        gamma=np.abs(dlam),
+    )
+    distance = T.c * r
+    azimuth = np.where(east, T.beta, tau - T.beta)
+    reverse_azimuth = np.where(east, tau - T.alpha, T.alpha)
+
+    # Along the meridian
+    meridian = dlam == 0
+    north = phi1 < phi2
+    distance = np.where(meridian, np.abs(phi1 - phi2) * r, distance)
+    azimuth = np.where(meridian, np.where(north, 0.0, pi), azimuth)
+    reverse_azimuth = np.where(meridian, np.where(north, pi, 0.0), reverse_azimuth)
+
+    return distance, azimuth, reverse_azimuth
+
+
 # Given two positions and their azimuths towards a third position, calculate the third position.
 def vws(
     P1: SphereCoords,
@@ -390,24 +1071,29 @@ def vws(
     a13: float,
     a23: float,
 ):
+    if _backend == "nvector":
+        phi3, lam3 = libnvector.vws_many(P1.phi, P1.lam, P2.phi, P2.lam, a13, a23)
+        return SphereCoords(float(phi3), float(lam3), P1.r)
+
     # Create a triangle containing P1, P2, P3.
     # At P1 is alpha, at P2 is beta. c is the distance between P1 and P2.
 
     # We already know P1 and P2, so we can calculate their distance and their azimuth towards each other.
     s12, a12, a21 = ha2(P1, P2)
 
-    if a12 > a13:
+    # The angle differences are clamped, so that azimuths on both sides of north work too.
+    if clamp_rad(a12 - a13) < pi:
         # P3 is "over" P1 and P2.
         T = SphereTriangle.wsw(
-            alpha=a12 - a13,
-            beta=a23 - a21,
+            alpha=clamp_rad(a12 - a13),
+            beta=clamp_rad(a23 - a21),
             c=s12,
         )
     else:
         # P3 is "under" P1 and P2.
         T = SphereTriangle.wsw(
-            alpha=a13 - a12,
-            beta=a21 - a23,
+            alpha=clamp_rad(a13 - a12),
+            beta=clamp_rad(a21 - a23),
             c=s12,
         )
     s13 = T.b
@@ -425,8 +1111,11 @@ def bgs(
     s13: float,
     s23: float,
 ):
-    s12, a12 = ha2(P1, P2)
-    s21, a21 = ha2(P2, P1)
+    if _backend == "nvector":
+        phi3, lam3 = libnvector.bgs_many(P1.phi, P1.lam, P2.phi, P2.lam, s13, s23, P1.r)
+        return SphereCoords(float(phi3), float(lam3), P1.r)
+
+    s12, a12, a21 = ha2(P1, P2)
 
     T = SphereTriangle.sss(a=s12, b=s13, c=s23)
 
@@ -441,122 +1130,284 @@ def bgs(
     return P3
 
 
-import numpy as np
-import cartopy.crs as ccrs
-import matplotlib.pyplot as plt
+# vws for arrays of point pairs and azimuths. Always computed with n-vectors.
+def vws_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    phi2: np.ndarray,
+    lam2: np.ndarray,
+    a13: np.ndarray,
+    a23: np.ndarray,
+):
+    return libnvector.vws_many(phi1, lam1, phi2, lam2, a13, a23)
+
+
+# bgs for arrays of point pairs and distances. Always computed with n-vectors.
+def bgs_many(
+    phi1: np.ndarray,
+    lam1: np.ndarray,
+    phi2: np.ndarray,
+    lam2: np.ndarray,
+    s13: np.ndarray,
+    s23: np.ndarray,
+    r: float = 1,
+):
+    return libnvector.bgs_many(phi1, lam1, phi2, lam2, s13, s23, r)
 
 
-def plot_point(
-    point: SphereCoords,
-    text: str = None,
-    text_xy=(0, 1.2e5),
-    **kwargs,
-):
-    """Draw a spherical coordinate as a point on the map."""
-    x, y = plt.gca().projection.transform_point(
-        point.lon(), point.lat(), ccrs.PlateCarree()
-    )
+# Result of solve_intersections.
+# Observations are numbered with all distances first, followed by all azimuths.
+@dataclass
+class IntersectionResult:
+    point: SphereCoords  # mean of the largest cluster of candidates
+    candidates: SphereCoordsArray  # every solution of every solvable combination
+    pairs: np.ndarray  # (M, 2) observations used for each candidate
+    inliers: np.ndarray  # (M,) candidates belonging to the cluster around point
+    # (K,) observed minus computed, as lengths (azimuths times distance)
+    residuals: np.ndarray
+    outliers: np.ndarray  # (K,) observations flagged as gross errors
+
+
+def solve_intersections(
+    stations: SphereCoordsArray,
+    dist_station: np.ndarray,
+    dist: np.ndarray,
+    az_station: np.ndarray,
+    az: np.ndarray,
+    tolerance: float,
+) -> IntersectionResult:
+    """
+    Locate an unknown point from distances and azimuths observed at fixed stations.
+
+    Every pair of observations that determines the point is solved (polar point,
+    Bogenschnitt, Vorwärtsschnitt or the ambiguous distance/azimuth case), all pairs of a kind
+    in one vectorized pass. The candidates are clustered: the candidate with the most
+    neighbours within tolerance seeds the cluster, whose mean is the resulting point.
+    Observations whose residual against that point exceeds the tolerance are flagged as outliers.
 
-    plt.plot(x, y, **kwargs)
-    if text is not None:
-        plt.annotate(
-            text,
-            (x + text_xy[0], y + text_xy[1]),
-            color="black",
-            ha="center",
-            fontweight="bold",
+    stations holds the fixed points, dist_station and az_station index into it.
+    Distances and the tolerance are lengths in the unit of the station radius.
+    """
+    if not isinstance(stations, SphereCoordsArray):
+        stations = SphereCoordsArray.from_coords(stations)
+    r = stations.r[0]
+
+    dist_station = np.asarray(dist_station, dtype=int)
+    az_station = np.asarray(az_station, dtype=int)
+    station = np.concatenate([dist_station, az_station])
+    value = np.concatenate([np.asarray(dist, dtype=float), np.asarray(az, dtype=float)])
+    is_az = np.arange(len(value)) >= len(dist_station)
+
+    # All pairs of observations. Order them so that a distance always comes first.
+    i, j = np.triu_indices(len(value), 1)
+    swap = is_az[i] & ~is_az[j]
+    i, j = np.where(swap, j, i), np.where(swap, i, j)
+
+    A, B = station[i], station[j]
+    same = A == B
+    polar = same & ~is_az[i] & is_az[j]
+    dd = ~same & ~is_az[i] & ~is_az[j]
+    aa = ~same & is_az[i] & is_az[j]
+    da = ~same & ~is_az[i] & is_az[j]
+
+    # Baselines between the two stations of each pair
+    sAB, aAB, aBA = ha2_many(
+        stations.phi[A], stations.lam[A], stations.phi[B], stations.lam[B]
+    )
+    vA, vB = value[i], value[j]
+
+    # Up to two candidates per pair, given as start station, distance and azimuth
+    # for the direct problem.
+    start = np.stack([A, A], axis=-1)
+    s = np.full((len(i), 2), np.nan)
+    a = np.full((len(i), 2), np.nan)
+
+    # Polar point: distance and azimuth from the same station
+    s[polar, 0] = vA[polar]
+    a[polar, 0] = vB[polar]
+
+    # Bogenschnitt: the angle at A lies opposite the side BN, on either side of AB.
+    T = SphereTriangle.sss_batch(a=vB[dd] / r, b=vA[dd] / r, c=sAB[dd])
+    s[dd] = vA[dd, None]
+    a[dd] = aAB[dd, None] + np.stack([T.alpha, -T.alpha], axis=-1)
+
+    # Vorwärtsschnitt: both rays have to point to the same side of AB.
+    wA = np.mod(vA[aa] - aAB[aa], tau)
+    wB = np.mod(aBA[aa] - vB[aa], tau)
+    right = (wA < pi) & (wB < pi)
+    left = (wA > pi) & (wB > pi)
+    T = SphereTriangle.wsw_batch(
+        alpha=np.where(left, tau - wA, wA),
+        beta=np.where(left, tau - wB, wB),
+        c=sAB[aa],
+    )
+    s[aa, 0] = np.where(right | left, T.b * r, np.nan)
+    a[aa, 0] = vA[aa]
+
+    # Distance from A and azimuth from B: the angle at B lies opposite the side AN,
+    # giving up to two solutions for the side BN.
+    wB = np.mod(vB[da] - aBA[da], tau)
+    T = SphereTriangle.ssw_batch(
+        a=vA[da] / r,
+        c=sAB[da],
+        alpha=np.where(wB > pi, tau - wB, wB),
+    )
+    start[da] = B[da, None]
+    s[da] = np.where(T.valid, T.b * r, np.nan)
+    a[da] = vB[da, None]
+
+    phi, lam, _ = ha1_many(stations.phi[start], stations.lam[start], s, a, r)
+    valid = np.isfinite(phi) & np.isfinite(lam)
+    pairs = np.broadcast_to(np.stack([i, j], axis=-1)[:, None, :], (len(i), 2, 2))
+    candidates = SphereCoordsArray(phi[valid], lam[valid], r)
+    pairs = pairs[valid]
+    if len(candidates) == 0:
+        raise ValueError(
+            "No combination of the observations can be solved: at least two observations "
+            "that determine the point (e.g. distances from two different stations, or a "
+            "distance and an azimuth from the same station) with consistent values are needed"
         )
 
+    # Cluster the candidates: seed with the one having the most close neighbours.
+    v = candidates.to_vec3() / r
+    angle = np.arccos(np.clip(v @ v.T, -1, 1))
+    close = angle <= tolerance / r
+    seed = np.argmax(close.sum(axis=1))
+    inliers = close[seed]
+    point = candidates[inliers].centroid()
+    point = SphereCoords(point.phi, point.lam, r)
+
+    # Residuals of all observations against the resulting point
+    s_obs, a_obs, _ = ha2_many(
+        stations.phi[station], stations.lam[station], point.phi, point.lam, r
+    )
+    residuals = np.where(
+        is_az,
+        (np.mod(value - a_obs + pi, tau) - pi) * s_obs,
+        value - s_obs,
+    )
+    outliers = np.abs(residuals) > tolerance
 
-def plot_line(p1: SphereCoords, p2: SphereCoords, **kwargs):
-    """Draw a geodesic line between two points, which will be curved by the projection."""
-    # Calculate the distance and azimuth between the two points.
-    max_dist, azimuth, _ = ha2(p1, p2)
+    return IntersectionResult(point, candidates, pairs, inliers, residuals, outliers)
 
-    # Interpolate a number of positions between the two points and calculate their spherical coordinates.
-    granularity = 0.01
-    num_points = int(max_dist / granularity)
 
-    coordinates = [p1]
-    for dist in np.linspace(0, max_dist, num_points):
-        p, _ = ha1(p1, dist, azimuth)
-        coordinates.append(p)
+def _signed_excess(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Spherical excess of the triangles with the unit vectors a, b, c as corners.
 
-    # Connect the points with a line.
-    plt.plot(
-        list(map(lambda p: p.lon(), coordinates)),
-        list(map(lambda p: p.lat(), coordinates)),
-        transform=ccrs.PlateCarree(),
-        **kwargs,
-    )
+    Same value as SphereTriangle.excess, but in closed form (Van Oosterom & Strackee),
+    and positive for counterclockwise, negative for clockwise triangles.
+    """
+    triple = np.sum(a * np.cross(b, c), axis=-1)
+    den = 1 + np.sum(a * b, axis=-1) + np.sum(b * c, axis=-1) + np.sum(c * a, axis=-1)
+    return 2 * np.arctan2(triple, den)
+
+
+# Area, perimeter and centroid of a spherical polygon, accumulated chunk by chunk.
+#
+# The ring is split into a fan of triangles from its first vertex, whose excesses add
+# up to the area. Only the first and the latest vertex are kept between chunks, so
+# arbitrarily long rings can be streamed in. The ring is closed implicitly.
+# Polygons are expected to be smaller than a hemisphere.
+class SpherePolygon:
+    r: float
+    first: np.ndarray
+    last: np.ndarray
+    excess: float
+    length: float
+    moment: np.ndarray
+
+    def __init__(self, r: float = 1):
+        self.r = r
+        self.first = None
+        self.last = None
+        self.excess = 0.0
+        self.length = 0.0
+        self.moment = np.zeros(3)
+
+    def add(self, phi: np.ndarray, lam: np.ndarray):
+        """Append the next vertices of the ring."""
+        phi, lam = np.broadcast_arrays(np.atleast_1d(phi), np.atleast_1d(lam))
+        if len(phi) == 0:
+            return self
+        cos_phi = np.cos(phi)
+        v = np.stack(
+            [cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)], axis=-1
+        )
 
+        if self.first is None:
+            self.first = v[0]
+        else:
+            v = np.concatenate([self.last[None, :], v])
+        self.last = v[-1]
 
-def plot_circle(center: SphereCoords, radius: float, **kwargs):
-    """Draw a geodesic circle around a point, which be squashed by the projection."""
-    # Interpolate a number of positions around the point in the given distance,
-    # and calculate their spherical coordinates.
-    coordinates: list[SphereCoords] = []
-    for azimuth in np.linspace(0, 2 * pi, 72):
-        p, _ = ha1(center, radius, azimuth)
-        coordinates.append(p)
-
-    # Connect the points with a line.
-    plt.plot(
-        list(map(lambda p: p.lon(), coordinates)),
-        list(map(lambda p: p.lat(), coordinates)),
-        transform=ccrs.PlateCarree(),
-        **kwargs,
-    )
+        excess, length, moment = self._edges(v[:-1], v[1:])
+        self.excess += excess
+        self.length += length
+        self.moment += moment
+        return self
 
+    def _edges(self, a: np.ndarray, b: np.ndarray):
+        """Contributions of the edges a -> b: fan triangle excess, edge length, first moment."""
+        o = np.broadcast_to(self.first, a.shape)
+        excess = _signed_excess(o, a, b)
+        normal = np.cross(a, b)
+        sin_length = np.linalg.norm(normal, axis=-1, keepdims=True)
+        length = np.arctan2(sin_length[:, 0], np.sum(a * b, axis=-1))
 
-def plot_azimuth(point: SphereCoords, azimuth: float, length: float = 0, **kwargs):
-    """Draw an azimuth line from a point, which will be curved by the projection. Also draws the angle into the map."""
+        # The integral of the position vector over the polygon is half the sum of the
+        # edge normals, each weighted by the edge length. Its direction is the centroid.
+        normal = normal / np.where(sin_length > 0, sin_length, 1)
+        moment = np.sum(length[:, None] * normal, axis=0) / 2
+        return np.sum(excess), np.sum(length), moment
 
-    north_dist = 0.02
-    angle_dist = 0.01
-    angle_granularity = 0.2
+    def _closed(self):
+        if self.first is None:
+            return 0.0, 0.0, np.zeros(3)
+        excess, length, moment = self._edges(self.last[None, :], self.first[None, :])
+        return self.excess + excess, self.length + length, self.moment + moment
 
-    # Get a point to the north of the given point, and draw an indication line to it.
-    pn, _ = ha1(point, north_dist, 0)
-    plot_line(point, pn, color="gray", linestyle="dotted")
+    def area(self) -> float:
+        excess, _, _ = self._closed()
+        return abs(excess) * self.r**2
 
-    # Draw the angle from the north direction to the given azimuth.
-    coordinates: list[SphereCoords] = []
-    for azimuth in np.linspace(0, azimuth, int(azimuth / angle_granularity)):
-        p, _ = ha1(point, angle_dist, azimuth)
-        coordinates.append(p)
-    plt.plot(
-        list(map(lambda p: p.lon(), coordinates)),
-        list(map(lambda p: p.lat(), coordinates)),
-        transform=ccrs.PlateCarree(),
-        **kwargs,
-    )
+    def perimeter(self) -> float:
+        _, length, _ = self._closed()
+        return length * self.r
 
-    # Draw the azimuth line from the point.
-    pa, _ = ha1(point, length, azimuth)
-    plot_line(point, pa, **kwargs)
+    def centroid(self) -> SphereCoords:
+        excess, _, moment = self._closed()
+        x, y, z = (moment * np.sign(excess)).tolist()
+        p = SphereCoords.from_vec3(Vec3(x, y, z))
+        return SphereCoords(p.phi, p.lam, self.r)
 
 
-def plot_angle(p1: SphereCoords, p2: SphereCoords, p3: SphereCoords, **kwargs):
-    """Draw an angle between the two rays p1p2 and p2p3"""
+def polygon_area(phi: np.ndarray, lam: np.ndarray, r: float = 1) -> float:
+    return SpherePolygon(r).add(phi, lam).area()
 
-    _, a12, _ = ha2(p1, p2)
-    _, a13, _ = ha2(p1, p3)
 
-    dist = 0.01
-    granularity = 0.1
+def polygon_perimeter(phi: np.ndarray, lam: np.ndarray, r: float = 1) -> float:
+    return SpherePolygon(r).add(phi, lam).perimeter()
 
-    if a13 < a12:
-        a13 += tau
 
-    coordinates = []
-    for azimuth in np.linspace(a12, a13, int(abs((a13 - a12) / granularity))):
-        p, _ = ha1(p1, dist, azimuth % tau)
-        coordinates.append(p)
+def polygon_centroid(phi: np.ndarray, lam: np.ndarray, r: float = 1) -> SphereCoords:
+    return SpherePolygon(r).add(phi, lam).centroid()
 
-    plt.plot(
-        list(map(lambda p: p.lon(), coordinates)),
-        list(map(lambda p: p.lat(), coordinates)),
-        transform=ccrs.PlateCarree(),
-        **kwargs,
-    )
+
+# The plotting helpers live in libsphereplot, which imports cartopy and matplotlib.
+# They are loaded on first access, so computations do not pay for these imports.
+_PLOT_FUNCTIONS = {
+    "plot_point",
+    "plot_line",
+    "plot_circle",
+    "plot_azimuth",
+    "plot_angle",
+}
+
+
+def __getattr__(name: str):
+    if name in _PLOT_FUNCTIONS:
+        import libsphereplot
+
+        return getattr(libsphereplot, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,107 @@
+"""
+Plotting helpers for libsphere, drawing onto the current cartopy map axes.
+
+Kept apart from libsphere so that computations do not import cartopy and matplotlib.
+They are still available as libsphere.plot_* (imported on first use).
+"""
+
+from __future__ import annotations
+from math import tau
+import numpy as np
+import cartopy.crs as ccrs
+import matplotlib.pyplot as plt
+from libsphere import SphereCoords, ha1, ha2
+from libdensify import densify_lines, densify_circles
+
+
+def plot_point(
+    point: SphereCoords,
+    text: str = None,
+    text_xy=(0, 1.2e5),
+    **kwargs,
+):
+    """Draw a spherical coordinate as a point on the map."""
+    x, y = plt.gca().projection.transform_point(
+        point.lon(), point.lat(), ccrs.PlateCarree()
+    )
+
+    plt.plot(x, y, **kwargs)
+    if text is not None:
+        plt.annotate(
+            text,
+            (x + text_xy[0], y + text_xy[1]),
+            color="black",
+            ha="center",
+            fontweight="bold",
+        )
+
+
+def _plot_polyline(phi: np.ndarray, lam: np.ndarray, **kwargs):
+    """Connect spherical coordinates (given as arrays in radians) with a line."""
+    plt.plot(
+        np.degrees(lam),
+        np.degrees(phi),
+        transform=ccrs.PlateCarree(),
+        **kwargs,
+    )
+
+
+def plot_line(p1: SphereCoords, p2: SphereCoords, **kwargs):
+    """Draw a geodesic line between two points, which will be curved by the projection."""
+    # Interpolate a number of positions between the two points.
+    granularity = 0.01
+    phi, lam, _ = densify_lines(p1.phi, p1.lam, p2.phi, p2.lam, step=granularity)
+    _plot_polyline(phi, lam, **kwargs)
+
+
+def plot_circle(center: SphereCoords, radius: float, **kwargs):
+    """Draw a geodesic circle around a point, which be squashed by the projection."""
+    # Interpolate a number of positions around the point in the given distance.
+    phi, lam, _ = densify_circles(center.phi, center.lam, radius, r=center.r, n=72)
+    _plot_polyline(phi, lam, **kwargs)
+
+
+def plot_azimuth(point: SphereCoords, azimuth: float, length: float = 0, **kwargs):
+    """Draw an azimuth line from a point, which will be curved by the projection. Also draws the angle into the map."""
+
+    north_dist = 0.02
+    angle_dist = 0.01
+    angle_granularity = 0.2
+
+    # Get a point to the north of the given point, and draw an indication line to it.
+    pn, _ = ha1(point, north_dist, 0)
+    plot_line(point, pn, color="gray", linestyle="dotted")
+
+    # Draw the angle from the north direction to the given azimuth.
+    phi, lam, _ = densify_circles(
+        point.phi,
+        point.lam,
+        angle_dist,
+        az1=0,
+        az2=azimuth,
+        r=point.r,
+        step=angle_granularity,
+    )
+    _plot_polyline(phi, lam, **kwargs)
+
+    # Draw the azimuth line from the point.
+    pa, _ = ha1(point, length, azimuth)
+    plot_line(point, pa, **kwargs)
+
+
+def plot_angle(p1: SphereCoords, p2: SphereCoords, p3: SphereCoords, **kwargs):
+    """Draw an angle between the two rays p1p2 and p2p3"""
+
+    _, a12, _ = ha2(p1, p2)
+    _, a13, _ = ha2(p1, p3)
+
+    dist = 0.01
+    granularity = 0.1
+
+    if a13 < a12:
+        a13 += tau
+
+    phi, lam, _ = densify_circles(
+        p1.phi, p1.lam, dist, az1=a12, az2=a13, r=p1.r, step=granularity
+    )
+    _plot_polyline(phi, lam, **kwargs)
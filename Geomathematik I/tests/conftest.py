@@ -0,0 +1,12 @@
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The flat module lib2d.py shadows the lib2d/ directory on sys.path, so the package is
+# registered explicitly for the tests of lib2d/*.py.
+lib2d = types.ModuleType("lib2d")
+lib2d.__path__ = [os.path.join(ROOT, "lib2d")]
+sys.modules["lib2d"] = lib2d
@@ -0,0 +1,58 @@
+import importlib.util
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from lib.Angle import rad
+from lib2d.Algorithms import (
+    CoordinateTransformation,
+    HA2_many,
+    Rückwärtsschnitt_Collins_many,
+    Rückwärtsschnitt_many,
+)
+from lib2d.Point import Point
+
+ROOT = Path(__file__).parent.parent
+
+
+# L, M, R and N on the circle around (50, 50) with radius 50
+def dangerous_circle():
+    t = np.array([3.4, 5.9, 5.1, 0.0])
+    x, y = 50 + 50 * np.cos(t), 50 + 50 * np.sin(t)
+    _, r = HA2_many(x[3], y[3], x[:3], y[:3])
+    return x[:3, None], y[:3, None], r
+
+
+@pytest.mark.parametrize(
+    "solve", [Rückwärtsschnitt_many, Rückwärtsschnitt_Collins_many]
+)
+def test_rückwärtsschnitt_dangerous_circle(solve):
+    x, y, r = dangerous_circle()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        xN, yN, valid = solve(
+            x[0], y[0], x[1], y[1], x[2], y[2], r[[0]], r[[1]], r[[2]]
+        )
+    assert not valid.any()
+    assert np.isnan(xN).all() and np.isnan(yN).all()
+
+
+def test_to_transform_matches_flat_module():
+    # The flat lib2d.py, which is shadowed by the package in the tests
+    spec = importlib.util.spec_from_file_location("lib2d_flat", ROOT / "lib2d.py")
+    flat = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = flat
+    spec.loader.exec_module(flat)
+
+    transformation = CoordinateTransformation(2.0, rad(0.5), Point(3.0, -1.0))
+    flat_transformation = flat.CoordinateTransformation(2.0, 0.5, flat.Point(3.0, -1.0))
+    m = transformation.to_transform().m
+    np.testing.assert_allclose(flat_transformation.to_transform(), m)
+
+    x, y = np.array([0.0, 10.0]), np.array([5.0, -2.0])
+    np.testing.assert_allclose(
+        (m @ np.stack([x, y, np.ones(2)]))[:2], transformation.transform_many(x, y)
+    )
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from lib3d import Vec3Array, fit_rotation
+
+
+def test_vec3array_copies_data():
+    data = np.array([[3.0, 0.0, 4.0], [0.0, 2.0, 0.0]])
+    vectors = Vec3Array(data)
+    np.testing.assert_allclose(vectors.normalize(), [5, 2])
+    np.testing.assert_allclose(vectors.data, [[0.6, 0, 0.8], [0, 1, 0]])
+    np.testing.assert_array_equal(data, [[3, 0, 4], [0, 2, 0]])
+
+
+def test_fit_rotation_at_iteration_limit():
+    rng = np.random.default_rng(1)
+    p = rng.normal(size=(20, 3))
+    c, s = np.cos(0.3), np.sin(0.3)
+    R = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+    r = p @ R.T
+    r[0] += [5, -5, 5]
+
+    fit = fit_rotation(Vec3Array(p), Vec3Array(r), outlier_factor=2, max_iterations=1)
+    assert not fit.inliers[0] and fit.inliers[1:].all()
+    # The rotation is fitted to the final inliers, not to all stations
+    assert fit.angle == pytest.approx(0.3)
+    assert fit.rms < 1e-12
+    np.testing.assert_allclose(
+        fit.residuals, np.linalg.norm(p @ fit.rotation.to_array().T - r, axis=1)
+    )
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+
+import libgeo
+
+MESSWERTE = os.path.join(
+    os.path.dirname(__file__), "..", "..", "Geodatenquellen", "Messwerte.txt"
+)
+
+
+def test_parse_angles_mixed_column():
+    strings = ["47,062083", "47°03,725", "47,0618292", "x"]
+    values, errors = libgeo.parse_angles(strings)
+    assert errors.tolist() == [False, False, False, True]
+    np.testing.assert_allclose(
+        np.degrees(values[:3]), [47.062083, 47 + 3.725 / 60, 47.0618292]
+    )
+
+
+def test_parse_angles_without_fallback():
+    values, errors = libgeo.parse_angles(["47,062083", "47°03,725"], "deg", False)
+    assert errors.tolist() == [False, True]
+    assert np.isnan(values[1])
+
+
+def test_read_angle_columns_messwerte():
+    result = libgeo.read_angle_columns(
+        MESSWERTE, [2, 3], delimiter="&", comment="\\hline"
+    )
+    (phi, phi_errors), (lam, lam_errors) = result[2], result[3]
+    assert len(phi) == len(lam) == 20
+    assert not phi_errors.any() and not lam_errors.any()
+    # The Garmin rows agree with their conversion in the following row
+    np.testing.assert_allclose(np.degrees(phi[0::5]), np.degrees(phi[1::5]), atol=1e-6)
+    np.testing.assert_allclose(np.degrees(lam[0::5]), np.degrees(lam[1::5]), atol=1e-6)